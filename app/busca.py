@@ -0,0 +1,74 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Busca textual em Item.nome e Item.descricao com FTS5 (apenas SQLite).
+# itens_fts é uma tabela virtual de conteúdo externo sobre itens, mantida
+# em sincronia por triggers; nenhuma rota precisa atualizá-la manualmente.
+
+TABELA_FTS = "itens_fts"
+
+_DDL_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        nome, descricao, content='itens', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS itens_fts_insercao AFTER INSERT ON itens BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS itens_fts_remocao AFTER DELETE ON itens BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS itens_fts_atualizacao AFTER UPDATE OF nome, descricao ON itens BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, nome, descricao) VALUES ('delete', old.id, old.nome, old.descricao);
+        INSERT INTO {TABELA_FTS}(rowid, nome, descricao) VALUES (new.id, new.nome, new.descricao);
+    END""",
+]
+
+# Acertos no nome pesam mais que na descrição
+_CONSULTA_BUSCA = text(f"""
+    SELECT itens.nome, itens.descricao, itens.tipo, itens.id, itens.personagem_id,
+           -bm25({TABELA_FTS}, 10.0, 1.0) AS relevancia
+    FROM {TABELA_FTS}
+    JOIN itens ON itens.id = {TABELA_FTS}.rowid
+    JOIN personagens ON personagens.id = itens.personagem_id
+    WHERE {TABELA_FTS} MATCH :consulta AND personagens.usuario_id = :usuario_id
+    ORDER BY relevancia DESC, itens.id
+    LIMIT :limit OFFSET :offset
+""")
+
+_PALAVRA = re.compile(r"\w+", re.UNICODE)
+
+def disponivel(dialeto: str) -> bool:
+    return dialeto == "sqlite"
+
+def instalar(conexao: Connection) -> None:
+    """Cria a tabela FTS e os triggers; indexa os itens existentes na primeira vez."""
+    if not disponivel(conexao.dialect.name):
+        return
+    nova = TABELA_FTS not in inspect(conexao).get_table_names()
+    for ddl in _DDL_FTS:
+        conexao.execute(text(ddl))
+    if nova:
+        conexao.execute(text(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')"))
+
+def montar_consulta(q: str) -> Optional[str]:
+    # Cada palavra vira um termo entre aspas com prefixo (*): "espa"* "long"*
+    # As aspas neutralizam a sintaxe do FTS5 digitada pelo usuário
+    palavras = _PALAVRA.findall(q)
+    if not palavras:
+        return None
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+async def buscar_itens(db: AsyncSession, usuario_id: int, q: str, limit: int, offset: int) -> List[dict]:
+    consulta = montar_consulta(q)
+    if consulta is None:
+        return []
+    resultado = await db.execute(
+        _CONSULTA_BUSCA,
+        {"consulta": consulta, "usuario_id": usuario_id, "limit": limit, "offset": offset},
+    )
+    return [dict(linha) for linha in resultado.mappings()]
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from .config import configuracoes
+
+@dataclass(frozen=True)
+class UsuarioAutenticado:
+    id: int
+    username: str
+    email: str
+
+class CacheUsuarios:
+    """Cache LRU com TTL de tokens já verificados -> usuário autenticado.
+
+    Uma entrada nunca vive além do ``exp`` do token que a originou.
+    """
+
+    def __init__(self, capacidade: int, ttl_segundos: int):
+        self.capacidade = capacidade
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[str, Tuple[UsuarioAutenticado, float]]" = OrderedDict()
+        self._tokens_por_usuario: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expiracoes = 0
+        self.invalidacoes = 0
+
+    def obter(self, token: str) -> Optional[UsuarioAutenticado]:
+        with self._lock:
+            entrada = self._entradas.get(token)
+            if entrada is None:
+                self.falhas += 1
+                return None
+            usuario, expira_em = entrada
+            if expira_em <= time.time():
+                self._remover(token)
+                self.expiracoes += 1
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(token)
+            self.acertos += 1
+            return usuario
+
+    def guardar(self, token: str, usuario: UsuarioAutenticado, exp: Optional[float] = None) -> None:
+        expira_em = time.time() + self.ttl_segundos
+        if exp is not None:
+            expira_em = min(expira_em, exp)
+        with self._lock:
+            if token in self._entradas:
+                self._remover(token)
+            self._entradas[token] = (usuario, expira_em)
+            self._tokens_por_usuario.setdefault(usuario.id, set()).add(token)
+            while len(self._entradas) > self.capacidade:
+                token_antigo = next(iter(self._entradas))
+                self._remover(token_antigo)
+
+    def invalidar_usuario(self, usuario_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_por_usuario.get(usuario_id, ())):
+                self._remover(token)
+                self.invalidacoes += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._tokens_por_usuario.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "capacidade": self.capacidade,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "expiracoes": self.expiracoes,
+                "invalidacoes": self.invalidacoes,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+    def _remover(self, token: str) -> None:
+        usuario, _ = self._entradas.pop(token)
+        tokens = self._tokens_por_usuario.get(usuario.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_por_usuario[usuario.id]
+
+    def metricas(self):
+        estatisticas = self.estatisticas()
+        yield "rpg_cache_usuarios_entradas", "gauge", "Tokens no cache de usuários.", [({}, estatisticas["entradas"])]
+        for evento in ("acertos", "falhas", "expiracoes", "invalidacoes"):
+            yield (
+                f"rpg_cache_usuarios_{evento}_total", "counter",
+                f"Cache de usuários: {evento}.", [({}, estatisticas[evento])],
+            )
+
+cache_usuarios = CacheUsuarios(
+    configuracoes.capacidade_cache_usuarios, configuracoes.ttl_cache_usuarios_segundos
+)
+
+# Custo aproximado de uma entrada além do corpo (tupla, chave, dict de cabeçalhos)
+SOBRECARGA_ENTRADA_BYTES = 256
+
+@dataclass(frozen=True)
+class RespostaEmCache:
+    etag: str
+    corpo: bytes
+    cabecalhos: Dict[str, str]
+    tamanho: int
+
+ChaveResposta = Tuple[int, int, str]
+
+class CacheRespostas:
+    """Cache LRU dos corpos JSON já codificados das leituras de um personagem.
+
+    A chave é (usuario_id, personagem_id, rota) e cada entrada guarda o ETag
+    com que foi gerada: uma entrada só é servida se o ETag atual (derivado de
+    Personagem.versao) for o mesmo, então escritas feitas por outros workers
+    ou fora das rotas que invalidam o cache nunca produzem respostas velhas.
+    O tamanho total é limitado em bytes.
+    """
+
+    def __init__(self, capacidade_bytes: int, maximo_entrada_bytes: int):
+        self.capacidade_bytes = capacidade_bytes
+        self.maximo_entrada_bytes = maximo_entrada_bytes
+        self._entradas: "OrderedDict[ChaveResposta, RespostaEmCache]" = OrderedDict()
+        self._chaves_por_personagem: Dict[Tuple[int, int], Set[ChaveResposta]] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.remocoes = 0
+        self.recusadas = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self.capacidade_bytes > 0
+
+    def obter(self, chave: ChaveResposta, etag: str) -> Optional[RespostaEmCache]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada.etag != etag:
+                if entrada is not None:
+                    self._remover(chave)
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada
+
+    def guardar(self, chave: ChaveResposta, etag: str, corpo: bytes, cabecalhos: Dict[str, str]) -> None:
+        tamanho = len(corpo) + sum(len(k) + len(v) for k, v in cabecalhos.items()) + SOBRECARGA_ENTRADA_BYTES
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            if tamanho > self.maximo_entrada_bytes or tamanho > self.capacidade_bytes:
+                self.recusadas += 1
+                return
+            self._entradas[chave] = RespostaEmCache(etag, corpo, cabecalhos, tamanho)
+            self._chaves_por_personagem.setdefault(chave[:2], set()).add(chave)
+            self.bytes += tamanho
+            while self.bytes > self.capacidade_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.remocoes += 1
+
+    def invalidar_personagem(self, usuario_id: int, personagem_id: int) -> None:
+        with self._lock:
+            for chave in list(self._chaves_por_personagem.get((usuario_id, personagem_id), ())):
+                self._remover(chave)
+                self.invalidacoes += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._chaves_por_personagem.clear()
+            self.bytes = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self.bytes,
+                "capacidade_bytes": self.capacidade_bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+                "remocoes": self.remocoes,
+                "recusadas": self.recusadas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            }
+
+    def _remover(self, chave: ChaveResposta) -> None:
+        entrada = self._entradas.pop(chave)
+        self.bytes -= entrada.tamanho
+        chaves = self._chaves_por_personagem.get(chave[:2])
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del self._chaves_por_personagem[chave[:2]]
+
+    def metricas(self):
+        estatisticas = self.estatisticas()
+        for nome, ajuda in (
+            ("entradas", "Respostas no cache."),
+            ("bytes", "Bytes ocupados pelo cache de respostas."),
+            ("capacidade_bytes", "Limite de bytes do cache de respostas."),
+        ):
+            yield f"rpg_cache_respostas_{nome}", "gauge", ajuda, [({}, estatisticas[nome])]
+        for evento in ("acertos", "falhas", "invalidacoes", "remocoes", "recusadas"):
+            yield (
+                f"rpg_cache_respostas_{evento}_total", "counter",
+                f"Cache de respostas: {evento}.", [({}, estatisticas[evento])],
+            )
+
+cache_respostas = CacheRespostas(
+    configuracoes.cache_respostas_bytes, configuracoes.cache_respostas_maximo_entrada_bytes
+)
@@ -1,14 +1,74 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./rpg_inventory.db"
+from .config import configuracoes
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = configuracoes.database_url
+
+# Driver de cada engine por dialeto: (síncrono, assíncrono). A URL pode vir
+# com qualquer driver (postgresql://, postgresql+asyncpg://, sqlite+pysqlite://...)
+DRIVERS = {
+    "sqlite": ("sqlite", "sqlite+aiosqlite"),
+    "postgresql": ("postgresql+psycopg2", "postgresql+asyncpg"),
+}
+
+def _trocar_driver(url: str, assincrono: bool) -> URL:
+    url = make_url(url)
+    drivers = DRIVERS.get(url.get_backend_name())
+    if drivers is None:
+        return url
+    return url.set(drivername=drivers[assincrono])
+
+def url_sincrona(url: str) -> URL:
+    return _trocar_driver(url, assincrono=False)
+
+def url_assincrona(url: str) -> URL:
+    # Troca o driver síncrono pelo equivalente assíncrono
+    return _trocar_driver(url, assincrono=True)
+
+def _opcoes_engine() -> dict:
+    if configuracoes.sqlite:
+        opcoes = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in SQLALCHEMY_DATABASE_URL:
+            return opcoes
+    else:
+        opcoes = {
+            "pool_pre_ping": True,
+            "pool_timeout": configuracoes.database_pool_timeout,
+            "pool_recycle": configuracoes.database_pool_recycle,
+        }
+    opcoes["pool_size"] = configuracoes.database_pool_size
+    opcoes["max_overflow"] = configuracoes.database_max_overflow
+    return opcoes
+
+def _aplicar_pragmas(engine_sync) -> None:
+    pragmas = configuracoes.pragmas_sqlite()
+    if not pragmas:
+        return
+
+    @event.listens_for(engine_sync, "connect")
+    def _ao_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+# Engine síncrona: criação de tabelas e scripts de linha de comando
+engine = create_engine(url_sincrona(SQLALCHEMY_DATABASE_URL), **_opcoes_engine())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrona: usada pelas rotas da API
+async_engine = create_async_engine(url_assincrona(SQLALCHEMY_DATABASE_URL), **_opcoes_engine())
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+_aplicar_pragmas(engine)
+_aplicar_pragmas(async_engine.sync_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,3 +77,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
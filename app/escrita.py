@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import configuracoes
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Escrita agrupada (group commit) para as mutações do inventário.
+# As operações de requisições concorrentes entram numa fila e um único coletor
+# as executa numa transação compartilhada, cada uma dentro de um SAVEPOINT,
+# fazendo um commit (e um fsync) por lote em vez de um por requisição.
+# Quem chama só recebe o resultado depois do commit do seu lote.
+# Ativado com RPG_ESCRITA_AGRUPADA=true.
+
+Operacao = Callable[..., Awaitable]
+
+class ColetorEscritas:
+    def __init__(self, intervalo_ms: float, maximo_operacoes: int, fabrica_sessao=AsyncSessionLocal):
+        self.intervalo = intervalo_ms / 1000
+        self.maximo_operacoes = maximo_operacoes
+        self._fabrica_sessao = fabrica_sessao
+        self._fila: Optional[asyncio.Queue] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self.lotes = 0
+        self.operacoes = 0
+        self.falhas_lote = 0
+
+    def iniciar(self) -> None:
+        self._fila = asyncio.Queue()
+        self._tarefa = asyncio.create_task(self._laco())
+
+    async def encerrar(self) -> None:
+        # As operações já enfileiradas são gravadas antes de o coletor parar
+        if self._tarefa is None:
+            return
+        self._fila.put_nowait(None)
+        await self._tarefa
+        self._tarefa = None
+
+    async def executar(self, operacao: Operacao, *args):
+        """Enfileira ``operacao(db, *args)`` e espera o commit do lote em que ela entrou."""
+        if self._tarefa is None or self._tarefa.done():
+            raise RuntimeError("Coletor de escritas não está em execução")
+        futuro = asyncio.get_running_loop().create_future()
+        self._fila.put_nowait((operacao, args, futuro))
+        return await futuro
+
+    async def _laco(self) -> None:
+        parar = False
+        while not parar:
+            primeira = await self._fila.get()
+            if primeira is None:
+                break
+            lote = [primeira]
+            # Espera um pouco para juntar outras escritas, a menos que o lote já esteja cheio
+            if self._fila.qsize() + 1 < self.maximo_operacoes:
+                await asyncio.sleep(self.intervalo)
+            while len(lote) < self.maximo_operacoes and not self._fila.empty():
+                proxima = self._fila.get_nowait()
+                if proxima is None:
+                    parar = True
+                    break
+                lote.append(proxima)
+            await self._gravar(lote)
+
+    async def _gravar(self, lote: List[Tuple[Operacao, tuple, asyncio.Future]]) -> None:
+        # Requisições canceladas enquanto esperavam na fila não são executadas
+        pendentes = [(operacao, args, futuro) for operacao, args, futuro in lote if not futuro.done()]
+        if not pendentes:
+            return
+        resultados = []
+        try:
+            async with self._fabrica_sessao() as db:
+                if db.bind.dialect.name == "sqlite":
+                    # O driver sqlite3 só abre a transação antes de um DML; sem o BEGIN
+                    # explícito o RELEASE do primeiro SAVEPOINT já faria o commit.
+                    # IMMEDIATE reserva a escrita logo no início e evita SQLITE_BUSY no meio do lote.
+                    await db.execute(text("BEGIN IMMEDIATE"))
+                for operacao, args, futuro in pendentes:
+                    try:
+                        async with db.begin_nested():
+                            resultados.append((futuro, await operacao(db, *args), None))
+                    except Exception as erro:
+                        # Só a operação que falhou é desfeita; as demais seguem no lote
+                        resultados.append((futuro, None, erro))
+                try:
+                    await db.commit()
+                except Exception:
+                    # Um COMMIT recusado (ex.: chave estrangeira adiada) deixa a
+                    # transação do SQLite aberta, mas o SQLAlchemy a dá por encerrada
+                    # e o pool não faz o ROLLBACK: a conexão é descartada para não
+                    # levar a transação pendente ao próximo lote
+                    await db.invalidate()
+                    raise
+        except Exception as erro:
+            self.falhas_lote += 1
+            logger.exception("Falha ao gravar lote de %d escritas", len(pendentes))
+            for _, _, futuro in pendentes:
+                if not futuro.done():
+                    futuro.set_exception(erro)
+            return
+
+        self.lotes += 1
+        self.operacoes += len(pendentes)
+        for futuro, resultado, erro in resultados:
+            if futuro.done():
+                continue
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(resultado)
+
+    def metricas(self):
+        yield "rpg_escrita_agrupada_lotes_total", "counter", "Lotes de escritas gravados.", [({}, self.lotes)]
+        yield (
+            "rpg_escrita_agrupada_operacoes_total", "counter",
+            "Operações de escrita gravadas em lotes.", [({}, self.operacoes)],
+        )
+        yield (
+            "rpg_escrita_agrupada_falhas_lote_total", "counter",
+            "Lotes de escritas desfeitos por erro no commit.", [({}, self.falhas_lote)],
+        )
+        yield "rpg_escrita_agrupada_fila", "gauge", "Operações aguardando na fila.", [({}, self._fila.qsize() if self._fila else 0)]
+
+coletor: Optional[ColetorEscritas] = None
+
+def iniciar() -> Optional[ColetorEscritas]:
+    global coletor
+    if configuracoes.escrita_agrupada and coletor is None:
+        coletor = ColetorEscritas(
+            configuracoes.escrita_agrupada_intervalo_ms, configuracoes.escrita_agrupada_maximo_operacoes
+        )
+        coletor.iniciar()
+    return coletor
+
+async def encerrar() -> None:
+    global coletor
+    if coletor is not None:
+        await coletor.encerrar()
+        coletor = None
+
+def metricas():
+    if coletor is not None:
+        yield from coletor.metricas()
+
+async def escrever(db: AsyncSession, operacao: Operacao, *args):
+    """Executa ``operacao(db, *args)`` e retorna depois de ela estar gravada.
+
+    Sem escrita agrupada, usa a sessão da requisição e faz o commit na hora.
+    """
+    if coletor is None:
+        resultado = await operacao(db, *args)
+        await db.commit()
+        return resultado
+    # Devolve a conexão da requisição ao pool antes de esperar pelo lote; do
+    # contrário requisições paradas na fila podem esgotar o pool usado pelo coletor
+    await db.close()
+    return await coletor.executar(operacao, *args)
@@ -0,0 +1,124 @@
+from collections import Counter
+from typing import Dict, Iterable
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+# Estatísticas de inventário mantidas de forma incremental: cada escrita em
+# itens ou personagens ajusta as tabelas contagens_* na mesma transação, e a
+# leitura das estatísticas não depende da quantidade de itens.
+# Reconciliação completa: python -m app.estatisticas
+
+TABELAS_CONTAGEM = (
+    models.ContagemItensPersonagem,
+    models.ContagemItensUsuario,
+    models.ContagemClassesUsuario,
+)
+
+def _chave(valor) -> str:
+    # Itens ou personagens antigos podem ter tipo/classe nulos
+    return valor if valor is not None else ""
+
+def _upsert(dialeto: str, modelo, chaves: Iterable[str]):
+    tabela = modelo.__table__
+    construtor = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+    instrucao = construtor(tabela)
+    return instrucao.on_conflict_do_update(
+        index_elements=list(chaves),
+        set_={"quantidade": tabela.c.quantidade + instrucao.excluded.quantidade},
+    )
+
+async def _ajustar(db: AsyncSession, modelo, chaves, linhas) -> None:
+    linhas = [linha for linha in linhas if linha["quantidade"]]
+    if linhas:
+        await db.execute(_upsert(db.bind.dialect.name, modelo, chaves), linhas)
+
+async def registrar_itens(db: AsyncSession, usuario_id: int, deltas: Dict[int, Counter]) -> None:
+    """Aplica variações de itens por tipo: {personagem_id: Counter({tipo: delta})}."""
+    por_usuario = Counter()
+    linhas_personagem = []
+    for personagem_id, por_tipo in deltas.items():
+        for tipo, delta in por_tipo.items():
+            linhas_personagem.append({"personagem_id": personagem_id, "tipo": _chave(tipo), "quantidade": delta})
+            por_usuario[_chave(tipo)] += delta
+    await _ajustar(db, models.ContagemItensPersonagem, ("personagem_id", "tipo"), linhas_personagem)
+    await _ajustar(db, models.ContagemItensUsuario, ("usuario_id", "tipo"), [
+        {"usuario_id": usuario_id, "tipo": tipo, "quantidade": delta} for tipo, delta in por_usuario.items()
+    ])
+
+async def registrar_classes(db: AsyncSession, usuario_id: int, deltas: Counter) -> None:
+    await _ajustar(db, models.ContagemClassesUsuario, ("usuario_id", "classe"), [
+        {"usuario_id": usuario_id, "classe": _chave(classe), "quantidade": delta} for classe, delta in deltas.items()
+    ])
+
+async def resumo_usuario(db: AsyncSession, usuario_id: int) -> dict:
+    itens = (await db.execute(
+        select(models.ContagemItensUsuario.tipo, models.ContagemItensUsuario.quantidade).where(
+            models.ContagemItensUsuario.usuario_id == usuario_id,
+            models.ContagemItensUsuario.quantidade > 0
+        )
+    )).all()
+    classes = (await db.execute(
+        select(models.ContagemClassesUsuario.classe, models.ContagemClassesUsuario.quantidade).where(
+            models.ContagemClassesUsuario.usuario_id == usuario_id,
+            models.ContagemClassesUsuario.quantidade > 0
+        )
+    )).all()
+    return {
+        "personagens": sum(quantidade for _, quantidade in classes),
+        "itens": sum(quantidade for _, quantidade in itens),
+        "personagens_por_classe": dict(sorted(classes)),
+        "itens_por_tipo": dict(sorted(itens)),
+    }
+
+async def resumo_personagem(db: AsyncSession, personagem_id: int) -> dict:
+    itens = (await db.execute(
+        select(models.ContagemItensPersonagem.tipo, models.ContagemItensPersonagem.quantidade).where(
+            models.ContagemItensPersonagem.personagem_id == personagem_id,
+            models.ContagemItensPersonagem.quantidade > 0
+        )
+    )).all()
+    return {
+        "personagem_id": personagem_id,
+        "itens": sum(quantidade for _, quantidade in itens),
+        "itens_por_tipo": dict(sorted(itens)),
+    }
+
+def reconstruir(conexao: Connection) -> None:
+    """Recalcula todos os contadores a partir de personagens e itens."""
+    for modelo in TABELAS_CONTAGEM:
+        conexao.execute(delete(modelo))
+    tipo = func.coalesce(models.Item.tipo, "")
+    conexao.execute(insert(models.ContagemItensPersonagem).from_select(
+        ["personagem_id", "tipo", "quantidade"],
+        select(models.Item.personagem_id, tipo, func.count())
+        .where(models.Item.personagem_id.is_not(None))
+        .group_by(models.Item.personagem_id, tipo)
+    ))
+    conexao.execute(insert(models.ContagemItensUsuario).from_select(
+        ["usuario_id", "tipo", "quantidade"],
+        select(models.Personagem.usuario_id, tipo, func.count())
+        .join(models.Personagem, models.Item.personagem_id == models.Personagem.id)
+        .where(models.Personagem.usuario_id.is_not(None))
+        .group_by(models.Personagem.usuario_id, tipo)
+    ))
+    classe = func.coalesce(models.Personagem.classe, "")
+    conexao.execute(insert(models.ContagemClassesUsuario).from_select(
+        ["usuario_id", "classe", "quantidade"],
+        select(models.Personagem.usuario_id, classe, func.count())
+        .where(models.Personagem.usuario_id.is_not(None))
+        .group_by(models.Personagem.usuario_id, classe)
+    ))
+
+if __name__ == "__main__":
+    from .database import engine
+    from .migracoes import migrar
+
+    migrar(engine)
+    with engine.begin() as conexao:
+        reconstruir(conexao)
+    print("Estatísticas reconstruídas")
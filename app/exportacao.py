@@ -0,0 +1,117 @@
+import json
+from typing import AsyncIterable, AsyncIterator, List
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import inventario, models, schemas
+from .database import AsyncSessionLocal
+
+# Exportação e importação do elenco de um usuário em NDJSON:
+# uma linha por personagem, com os itens embutidos.
+# {"nome": "...", "classe": "...", "nivel": 1, "itens": [{"nome": "...", "descricao": "...", "tipo": "..."}]}
+
+TAMANHO_LOTE = 500
+TAMANHO_MAXIMO_LINHA = 1024 * 1024
+# Um lote também é gravado ao somar este tamanho em linhas, para que linhas
+# grandes não acumulem centenas de MB em memória
+TAMANHO_MAXIMO_LOTE_BYTES = 4 * 1024 * 1024
+
+class ErroImportacao(Exception):
+    pass
+
+def _linha_ndjson(personagem: dict) -> bytes:
+    return json.dumps(personagem, ensure_ascii=False).encode("utf-8") + b"\n"
+
+async def exportar_ndjson(usuario_id: int) -> AsyncIterator[bytes]:
+    # A sessão é aberta aqui porque o corpo da resposta é gerado depois
+    # que as dependências da rota já foram encerradas
+    async with AsyncSessionLocal() as db:
+        consulta = (
+            select(
+                models.Personagem.id,
+                models.Personagem.nome,
+                models.Personagem.classe,
+                models.Personagem.nivel,
+                models.Item.nome.label("item_nome"),
+                models.Item.descricao.label("item_descricao"),
+                models.Item.tipo.label("item_tipo"),
+            )
+            .outerjoin(models.Item, models.Item.personagem_id == models.Personagem.id)
+            .where(models.Personagem.usuario_id == usuario_id)
+            .order_by(models.Personagem.id, models.Item.id)
+            .execution_options(yield_per=TAMANHO_LOTE)
+        )
+        resultado = await db.stream(consulta)
+        atual_id = None
+        atual = None
+        async for linhas in resultado.partitions():
+            pedaco = []
+            for linha in linhas:
+                if linha.id != atual_id:
+                    if atual is not None:
+                        pedaco.append(_linha_ndjson(atual))
+                    atual_id = linha.id
+                    atual = {"nome": linha.nome, "classe": linha.classe, "nivel": linha.nivel, "itens": []}
+                if linha.item_nome is not None:
+                    atual["itens"].append({
+                        "nome": linha.item_nome,
+                        "descricao": linha.item_descricao,
+                        "tipo": linha.item_tipo,
+                    })
+            if pedaco:
+                yield b"".join(pedaco)
+        if atual is not None:
+            yield _linha_ndjson(atual)
+
+async def _linhas(corpo: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    restante = b""
+    async for pedaco in corpo:
+        restante += pedaco
+        *completas, restante = restante.split(b"\n")
+        if len(restante) > TAMANHO_MAXIMO_LINHA:
+            raise ErroImportacao("Linha excede o tamanho máximo permitido")
+        for linha in completas:
+            yield linha
+    yield restante
+
+async def importar_ndjson(db: AsyncSession, usuario_id: int, corpo: AsyncIterable[bytes]) -> dict:
+    """Insere os personagens do corpo NDJSON em lotes, sem fazer commit.
+
+    Personagens com nome já usado pelo usuário são ignorados, como em criar_personagem.
+    """
+    totais = {"personagens": 0, "itens": 0, "ignorados": 0}
+    lote: List[schemas.PersonagemImportar] = []
+    bytes_lote = 0
+
+    async def gravar():
+        nonlocal bytes_lote
+        # Lotes anteriores já foram inseridos nesta transação, então nomes
+        # repetidos entre lotes também são ignorados
+        gravados = await inventario.inserir_personagens(
+            db, usuario_id,
+            [p.model_dump(exclude={"itens"}) for p in lote],
+            [[item.model_dump() for item in p.itens] for p in lote],
+        )
+        for chave in totais:
+            totais[chave] += gravados[chave]
+        lote.clear()
+        bytes_lote = 0
+
+    numero = 0
+    async for linha in _linhas(corpo):
+        numero += 1
+        if not linha.strip():
+            continue
+        try:
+            personagem = schemas.PersonagemImportar.model_validate_json(linha)
+        except ValidationError as e:
+            raise ErroImportacao(f"Linha {numero}: {e}") from e
+        lote.append(personagem)
+        bytes_lote += len(linha)
+        if len(lote) >= TAMANHO_LOTE or bytes_lote >= TAMANHO_MAXIMO_LOTE_BYTES:
+            await gravar()
+    if lote:
+        await gravar()
+    return totais
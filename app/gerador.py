@@ -0,0 +1,100 @@
+import random
+from itertools import accumulate
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import inventario
+
+# Geração aleatória de personagens e itens. Todos os sorteios de um lote são
+# feitos de uma vez com random.choices, e a mesma semente sempre produz o
+# mesmo elenco, o que permite reproduzir fixtures de teste de carga.
+
+TAMANHO_LOTE = 1000
+
+CLASSES = ["Guerreiro", "Mago", "Ladino", "Clérigo", "Paladino", "Bardo", "Druida", "Patrulheiro"]
+NOMES = [
+    "Aldric", "Brenna", "Cedric", "Dalia", "Eldon", "Fiona", "Garrick", "Helena",
+    "Ivor", "Jora", "Kael", "Lyra", "Marek", "Nadia", "Orin", "Petra",
+]
+TIPOS_ITEM = {
+    "arma": ["Espada", "Machado", "Arco", "Adaga", "Cajado", "Martelo"],
+    "armadura": ["Cota de Malha", "Couraça", "Elmo", "Escudo", "Manto"],
+    "poção": ["Poção de Cura", "Poção de Mana", "Elixir", "Tônico"],
+    "anel": ["Anel de Proteção", "Anel de Força", "Anel Arcano"],
+    "pergaminho": ["Pergaminho de Fogo", "Pergaminho de Gelo", "Pergaminho de Luz"],
+}
+QUALIDADES = ["Comum", "Incomum", "Raro", "Épico", "Lendário"]
+PESOS_QUALIDADE = [50, 25, 15, 8, 2]
+
+# Tabela de saque: peso de cada tipo de item por classe (mesma ordem de TIPOS_ITEM)
+TABELA_SAQUE = {
+    "Guerreiro": [5, 4, 2, 1, 0],
+    "Mago": [1, 1, 3, 2, 5],
+    "Ladino": [5, 2, 2, 2, 1],
+    "Clérigo": [2, 3, 4, 2, 2],
+    "Paladino": [4, 5, 2, 2, 1],
+    "Bardo": [2, 2, 3, 3, 3],
+    "Druida": [2, 2, 4, 2, 3],
+    "Patrulheiro": [5, 3, 2, 1, 1],
+}
+_TIPOS = list(TIPOS_ITEM)
+_PESOS_ACUMULADOS = {classe: list(accumulate(pesos)) for classe, pesos in TABELA_SAQUE.items()}
+
+def nova_semente() -> int:
+    return random.SystemRandom().randrange(2 ** 31)
+
+def gerar_elenco(
+    rng: random.Random,
+    quantidade: int,
+    nivel_minimo: int = 1,
+    nivel_maximo: int = 20,
+    itens_minimo: int = 0,
+    itens_maximo: int = 5,
+    classes: Optional[Sequence[str]] = None,
+    inicio_numeracao: int = 1,
+) -> Tuple[List[dict], List[List[dict]]]:
+    """Sorteia ``quantidade`` personagens e o inventário de cada um.
+
+    Devolve (personagens, itens_por_personagem), alinhados pelo índice.
+    """
+    classes_sorteadas = rng.choices(classes or CLASSES, k=quantidade)
+    nomes = rng.choices(NOMES, k=quantidade)
+    niveis = [rng.randint(nivel_minimo, nivel_maximo) for _ in range(quantidade)]
+    quantidades_itens = [rng.randint(itens_minimo, itens_maximo) for _ in range(quantidade)]
+    qualidades = rng.choices(QUALIDADES, weights=PESOS_QUALIDADE, k=sum(quantidades_itens))
+
+    personagens = []
+    itens_por_personagem = []
+    proxima_qualidade = 0
+    for i, (classe, nome, nivel, total_itens) in enumerate(zip(classes_sorteadas, nomes, niveis, quantidades_itens)):
+        personagens.append({"nome": f"{nome} {inicio_numeracao + i}", "classe": classe, "nivel": nivel})
+        pesos = _PESOS_ACUMULADOS.get(classe)
+        tipos = rng.choices(_TIPOS, cum_weights=pesos, k=total_itens)
+        itens = []
+        for tipo in tipos:
+            qualidade = qualidades[proxima_qualidade]
+            proxima_qualidade += 1
+            itens.append({
+                "nome": f"{rng.choice(TIPOS_ITEM[tipo])} {qualidade}",
+                "descricao": f"{tipo.capitalize()} de qualidade {qualidade.lower()}. Saque de {nome}.",
+                "tipo": tipo,
+            })
+        itens_por_personagem.append(itens)
+    return personagens, itens_por_personagem
+
+async def inserir_elenco(
+    db: AsyncSession, usuario_id: int, personagens: List[dict], itens_por_personagem: List[List[dict]]
+) -> dict:
+    """Insere o elenco gerado em lotes, sem fazer commit.
+
+    Personagens com nome já usado pelo usuário são ignorados.
+    """
+    totais = {"personagens": 0, "itens": 0, "ignorados": 0, "ids": []}
+    for inicio in range(0, len(personagens), TAMANHO_LOTE):
+        lote = await inventario.inserir_personagens(
+            db, usuario_id, personagens[inicio:inicio + TAMANHO_LOTE], itens_por_personagem[inicio:inicio + TAMANHO_LOTE]
+        )
+        for chave in totais:
+            totais[chave] += lote[chave]
+    return totais
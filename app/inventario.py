@@ -0,0 +1,172 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import estatisticas, models, sincronizacao
+
+# Operações de escrita no inventário compartilhadas pelas rotas unitárias e em lote.
+# Nenhuma função faz commit: quem chama decide o limite da transação.
+
+CAMPOS_ITEM = ("nome", "descricao", "tipo")
+CAMPOS_PERSONAGEM = ("nome", "classe", "nivel")
+
+async def personagem_pertence_ao_usuario(db: AsyncSession, personagem_id: int, usuario_id: int) -> bool:
+    encontrado = await db.scalar(select(models.Personagem.id).where(
+        models.Personagem.id == personagem_id,
+        models.Personagem.usuario_id == usuario_id
+    ))
+    return encontrado is not None
+
+async def versao_personagem(db: AsyncSession, personagem_id: int, usuario_id: int) -> Optional[int]:
+    # Também serve como verificação de posse: None se o personagem não for do usuário
+    return await db.scalar(select(models.Personagem.versao).where(
+        models.Personagem.id == personagem_id,
+        models.Personagem.usuario_id == usuario_id
+    ))
+
+async def incrementar_versao(db: AsyncSession, personagem_id: int) -> None:
+    await db.execute(
+        update(models.Personagem)
+        .where(models.Personagem.id == personagem_id)
+        .values(versao=models.Personagem.versao + 1),
+        execution_options={"synchronize_session": False}
+    )
+
+async def _tipos_dos_itens(db: AsyncSession, usuario_id: int, personagem_id: int, ids) -> Dict[int, str]:
+    # Uma única consulta confirma a posse de todos os itens pedidos e traz
+    # o tipo atual de cada um, usado para ajustar as estatísticas
+    resultado = await db.execute(
+        select(models.Item.id, models.Item.tipo).join(models.Personagem).where(
+            models.Item.id.in_(set(ids)),
+            models.Item.personagem_id == personagem_id,
+            models.Personagem.usuario_id == usuario_id
+        )
+    )
+    return dict(resultado.all())
+
+async def inserir_com_ids(db: AsyncSession, modelo, linhas: List[dict]) -> List[int]:
+    """Insere ``linhas`` numa única instrução e devolve os ids na mesma ordem."""
+    if db.bind.dialect.name != "sqlite":
+        # No PostgreSQL o insertmanyvalues agrupa as linhas num INSERT ... RETURNING ordenado
+        resultado = await db.scalars(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), linhas)
+        return list(resultado.all())
+    # No SQLite o RETURNING ordenado vira um INSERT por linha. Um executemany
+    # roda inteiro com a trava de escrita, então os ids são consecutivos e
+    # terminam em last_insert_rowid()
+    await db.execute(insert(modelo), linhas)
+    ultimo = await db.scalar(text("SELECT last_insert_rowid()"))
+    return list(range(ultimo - len(linhas) + 1, ultimo + 1))
+
+async def inserir_itens(db: AsyncSession, usuario_id: int, personagem_id: int, itens: List[dict]) -> List[dict]:
+    """Insere os itens no personagem e devolve cada um com o id, na ordem recebida."""
+    if not itens:
+        return []
+    linhas = [
+        {**{campo: item[campo] for campo in CAMPOS_ITEM}, "personagem_id": personagem_id}
+        for item in itens
+    ]
+    ids = await inserir_com_ids(db, models.Item, linhas)
+    await incrementar_versao(db, personagem_id)
+    await estatisticas.registrar_itens(db, usuario_id, {personagem_id: Counter(linha["tipo"] for linha in linhas)})
+    await sincronizacao.registrar(
+        db, usuario_id, sincronizacao.ITEM, sincronizacao.CRIAR, [(item_id, personagem_id) for item_id in ids]
+    )
+    return [{**linha, "id": item_id} for item_id, linha in zip(ids, linhas)]
+
+async def atualizar_itens(
+    db: AsyncSession, usuario_id: int, personagem_id: int, alteracoes: List[dict]
+) -> Dict[int, dict]:
+    """Atualiza os itens do personagem e devolve {id: item atualizado}.
+
+    Ids que não pertencem ao personagem do usuário ficam fora do resultado.
+    """
+    if not alteracoes:
+        return {}
+    # Se o mesmo id aparecer mais de uma vez, vale a última alteração
+    por_id = {alteracao["id"]: alteracao for alteracao in alteracoes}
+    tipos_atuais = await _tipos_dos_itens(db, usuario_id, personagem_id, por_id)
+    linhas = [
+        {"id": item_id, **{campo: alteracao[campo] for campo in CAMPOS_ITEM}}
+        for item_id, alteracao in por_id.items()
+        if item_id in tipos_atuais
+    ]
+    if linhas:
+        await db.execute(update(models.Item), linhas)
+        await incrementar_versao(db, personagem_id)
+        deltas = Counter()
+        for linha in linhas:
+            deltas[tipos_atuais[linha["id"]]] -= 1
+            deltas[linha["tipo"]] += 1
+        await estatisticas.registrar_itens(db, usuario_id, {personagem_id: deltas})
+        await sincronizacao.registrar(
+            db, usuario_id, sincronizacao.ITEM, sincronizacao.ATUALIZAR, [(linha["id"], personagem_id) for linha in linhas]
+        )
+    return {linha["id"]: {**linha, "personagem_id": personagem_id} for linha in linhas}
+
+async def remover_itens(db: AsyncSession, usuario_id: int, personagem_id: int, ids: List[int]) -> Set[int]:
+    if not ids:
+        return set()
+    tipos_atuais = await _tipos_dos_itens(db, usuario_id, personagem_id, ids)
+    if tipos_atuais:
+        await db.execute(
+            delete(models.Item).where(models.Item.id.in_(tipos_atuais)),
+            execution_options={"synchronize_session": False}
+        )
+        await incrementar_versao(db, personagem_id)
+        deltas = Counter()
+        for tipo in tipos_atuais.values():
+            deltas[tipo] -= 1
+        await estatisticas.registrar_itens(db, usuario_id, {personagem_id: deltas})
+        await sincronizacao.registrar(
+            db, usuario_id, sincronizacao.ITEM, sincronizacao.REMOVER, [(item_id, personagem_id) for item_id in tipos_atuais]
+        )
+    return set(tipos_atuais)
+
+async def nomes_existentes(db: AsyncSession, usuario_id: int, nomes: List[str]) -> Set[str]:
+    resultado = await db.scalars(select(models.Personagem.nome).where(
+        models.Personagem.usuario_id == usuario_id,
+        models.Personagem.nome.in_(nomes)
+    ))
+    return set(resultado.all())
+
+async def inserir_personagens(
+    db: AsyncSession, usuario_id: int, personagens: List[dict], itens_por_personagem: List[List[dict]]
+) -> dict:
+    """Insere personagens com os itens de cada um (listas alinhadas pelo índice).
+
+    Personagens com nome já usado pelo usuário, ou repetido na própria lista,
+    são ignorados. Devolve {"personagens", "itens", "ignorados", "ids"}.
+    """
+    existentes = await nomes_existentes(db, usuario_id, [p["nome"] for p in personagens])
+    novos = []
+    for personagem, itens in zip(personagens, itens_por_personagem):
+        if personagem["nome"] not in existentes:
+            existentes.add(personagem["nome"])
+            novos.append((personagem, itens))
+    totais = {"personagens": len(novos), "itens": 0, "ignorados": len(personagens) - len(novos), "ids": []}
+    if not novos:
+        return totais
+
+    ids = await inserir_com_ids(db, models.Personagem, [
+        {**{campo: p[campo] for campo in CAMPOS_PERSONAGEM}, "usuario_id": usuario_id} for p, _ in novos
+    ])
+    linhas_itens = [
+        {**{campo: item[campo] for campo in CAMPOS_ITEM}, "personagem_id": personagem_id}
+        for personagem_id, (_, itens) in zip(ids, novos)
+        for item in itens
+    ]
+    if linhas_itens:
+        await db.execute(insert(models.Item), linhas_itens)
+
+    await estatisticas.registrar_classes(db, usuario_id, Counter(p["classe"] for p, _ in novos))
+    await estatisticas.registrar_itens(db, usuario_id, {
+        personagem_id: Counter(item["tipo"] for item in itens) for personagem_id, (_, itens) in zip(ids, novos)
+    })
+    await sincronizacao.registrar(db, usuario_id, sincronizacao.PERSONAGEM, sincronizacao.CRIAR, zip(ids, ids))
+    # Os personagens são novos: todos os itens deles são os que acabaram de ser inseridos
+    await sincronizacao.registrar_itens_criados(db, ids)
+    totais["itens"] = len(linhas_itens)
+    totais["ids"] = list(ids)
+    return totais
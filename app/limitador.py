@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from .config import configuracoes
+
+# Controle de admissão por token bucket, em memória (por processo).
+# Cada categoria de rota tem o próprio orçamento, e cada chave (usuário
+# autenticado ou IP do cliente) tem um balde nessa categoria: rotas caras
+# (bcrypt, lotes) não consomem o orçamento das leituras baratas.
+
+class LimiteExcedidoError(Exception):
+    def __init__(self, categoria: str, segundos: float):
+        super().__init__(f"Limite de requisições excedido ({categoria})")
+        self.categoria = categoria
+        self.segundos = segundos
+
+class Limitador:
+    """Baldes de tokens por chave, com no máximo ``maximo_chaves`` baldes (LRU)."""
+
+    def __init__(self, categoria: str, capacidade: float, por_minuto: float, maximo_chaves: int):
+        self.categoria = categoria
+        self.capacidade = capacidade
+        self.taxa = por_minuto / 60
+        self.maximo_chaves = maximo_chaves
+        self._baldes: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.permitidas = 0
+        self.bloqueadas = 0
+
+    def consumir(self, chave: str, custo: float = 1) -> float:
+        """Retira ``custo`` tokens do balde da chave.
+
+        Devolve 0 se a requisição foi admitida, ou quantos segundos faltam
+        para o balde ter tokens suficientes.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is None:
+                # Baldes esquecidos pelo LRU recomeçam cheios
+                balde = self._baldes[chave] = [self.capacidade, agora]
+                if len(self._baldes) > self.maximo_chaves:
+                    self._baldes.popitem(last=False)
+            else:
+                self._baldes.move_to_end(chave)
+                balde[0] = min(self.capacidade, balde[0] + (agora - balde[1]) * self.taxa)
+                balde[1] = agora
+            if balde[0] >= custo:
+                balde[0] -= custo
+                self.permitidas += 1
+                return 0.0
+            self.bloqueadas += 1
+            return (custo - balde[0]) / self.taxa if self.taxa > 0 else float("inf")
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._baldes.clear()
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"chaves": len(self._baldes), "permitidas": self.permitidas, "bloqueadas": self.bloqueadas}
+
+def _criar_limitadores() -> Dict[str, Limitador]:
+    orcamentos: Dict[str, Tuple[float, float]] = {
+        # Login, cadastro, troca de senha e operações em lote/importação
+        "caro": (configuracoes.limite_caro_capacidade, configuracoes.limite_caro_por_minuto),
+        # Criação, alteração e remoção unitárias
+        "escrita": (configuracoes.limite_escrita_capacidade, configuracoes.limite_escrita_por_minuto),
+        "leitura": (configuracoes.limite_leitura_capacidade, configuracoes.limite_leitura_por_minuto),
+    }
+    return {
+        categoria: Limitador(categoria, capacidade, por_minuto, configuracoes.limite_maximo_chaves)
+        for categoria, (capacidade, por_minuto) in orcamentos.items()
+    }
+
+limitadores = _criar_limitadores()
+
+def verificar(categoria: str, chave: str) -> None:
+    if not configuracoes.limitador_ativo:
+        return
+    segundos = limitadores[categoria].consumir(chave)
+    if segundos:
+        raise LimiteExcedidoError(categoria, segundos)
+
+def metricas():
+    estatisticas = {categoria: limitador.estatisticas() for categoria, limitador in limitadores.items()}
+    yield (
+        "rpg_limitador_chaves", "gauge", "Baldes de tokens em memória por categoria.",
+        [({"categoria": categoria}, valores["chaves"]) for categoria, valores in estatisticas.items()],
+    )
+    for evento in ("permitidas", "bloqueadas"):
+        yield (
+            f"rpg_limitador_{evento}_total", "counter", f"Limitador de requisições: {evento}.",
+            [({"categoria": categoria}, valores[evento]) for categoria, valores in estatisticas.items()],
+        )
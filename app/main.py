@@ -1,41 +1,83 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import hashlib
+import math
+import logging
+import random
+from collections import Counter
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from . import models, schemas, security
-from .database import engine, get_db
-from typing import List
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from . import busca, escrita, estatisticas, exportacao, gerador, inventario, limitador, metricas, migracoes, models, schemas, security, serializacao, sincronizacao
+from .cache import UsuarioAutenticado, cache_respostas, cache_usuarios
+from .config import configuracoes
+from .database import async_engine, engine, get_async_db
+from typing import List, Literal, Optional
 from datetime import timedelta
 
-# Criar as tabelas no banco de dados
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Simulador de Inventário de RPG")
+# O esquema do banco não é criado nem migrado na importação: rode
+# "python -m app.migracoes" (ou app.servidor, que migra antes de subir os workers)
 
-# Configuração do CORS
+# Contagem e tempo das consultas SQL por requisição
+metricas.instrumentar_engine(engine)
+metricas.instrumentar_engine(async_engine.sync_engine)
+metricas.registro.adicionar_coletor(cache_usuarios.metricas)
+metricas.registro.adicionar_coletor(cache_respostas.metricas)
+metricas.registro.adicionar_coletor(escrita.metricas)
+metricas.registro.adicionar_coletor(limitador.metricas)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=3600,
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    security.iniciar_executor_hash()
+    escrita.iniciar()
+    yield
+    await escrita.encerrar()
+    security.encerrar_executor_hash()
+    await async_engine.dispose()
+
+router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-@app.post("/login", response_model=schemas.Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.username == form_data.username).first()
+async def fila_hash_cheia_handler(request: Request, exc: security.FilaHashCheiaError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servidor ocupado. Por favor, tente novamente em instantes."},
+        headers={"Retry-After": "1"},
+    )
+
+async def limite_excedido_handler(request: Request, exc: limitador.LimiteExcedidoError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Muitas requisições. Tente novamente mais tarde."},
+        headers={"Retry-After": str(max(1, math.ceil(exc.segundos)))},
+    )
+
+# Limites por IP do cliente, para rotas públicas
+def _limite_por_ip(categoria: str):
+    async def verificar_limite(request: Request):
+        limitador.verificar(categoria, "ip:" + (request.client.host if request.client else "desconhecido"))
+    return Depends(verificar_limite)
+
+LIMITE_CARO_IP = _limite_por_ip("caro")
+
+@router.post("/login", response_model=schemas.Token, dependencies=[LIMITE_CARO_IP])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    usuario = await db.scalar(select(models.Usuario).where(models.Usuario.username == form_data.username))
     if not usuario:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nome de usuário ou password incorretos",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not security.verificar_password(form_data.password, usuario.password_hash):
+    if not await security.verificar_password_async(form_data.password, usuario.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nome de usuário ou password incorretos",
@@ -50,20 +92,40 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Função auxiliar para obter o usuário atual
-async def obter_usuario_atual(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def obter_usuario_atual(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credenciais_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    usuario = cache_usuarios.obter(token)
+    if usuario is not None:
+        return usuario
     token_data = security.verificar_token(token, credenciais_exception)
-    usuario = db.query(models.Usuario).filter(models.Usuario.username == token_data.username).first()
-    if usuario is None:
+    resultado = await db.execute(
+        select(models.Usuario.id, models.Usuario.username, models.Usuario.email).where(
+            models.Usuario.username == token_data.username
+        )
+    )
+    linha = resultado.first()
+    if linha is None:
         raise credenciais_exception
+    usuario = UsuarioAutenticado(id=linha.id, username=linha.username, email=linha.email)
+    cache_usuarios.guardar(token, usuario, token_data.exp)
     return usuario
 
+# Limites por usuário autenticado (obter_usuario_atual roda uma vez por requisição)
+def _limite_por_usuario(categoria: str):
+    async def verificar_limite(usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual)):
+        limitador.verificar(categoria, f"u:{usuario_atual.id}")
+    return Depends(verificar_limite)
+
+LIMITE_CARO = _limite_por_usuario("caro")
+LIMITE_ESCRITA = _limite_por_usuario("escrita")
+LIMITE_LEITURA = _limite_por_usuario("leitura")
+
 # Rotas públicas
-@app.get("/")
+@router.get("/")
 def read_root():
     return {
         "message": "Bem-vindo ao Simulador de Inventário de RPG",
@@ -71,7 +133,7 @@ def read_root():
         "description": "API para gerenciamento de personagens e itens de RPG"
     }
 
-@app.get("/exemplos")
+@router.get("/exemplos")
 def get_examples():
     return {
         "personagens": [
@@ -96,93 +158,242 @@ def get_examples():
         ]
     }
 
+@router.get("/metrics", include_in_schema=False)
+def exportar_metricas():
+    return PlainTextResponse(
+        metricas.registro.exportar_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
 # Autenticação
-@app.post("/register", response_model=schemas.Usuario)
-def registrar_usuario(usuario: schemas.UsuarioCriar, db: Session = Depends(get_db)):
-    db_usuario = db.query(models.Usuario).filter(models.Usuario.username == usuario.username).first()
+@router.post("/register", response_model=schemas.Usuario, dependencies=[LIMITE_CARO_IP])
+async def registrar_usuario(usuario: schemas.UsuarioCriar, db: AsyncSession = Depends(get_async_db)):
+    db_usuario = await db.scalar(select(models.Usuario).where(models.Usuario.username == usuario.username))
     if db_usuario:
         raise HTTPException(status_code=400, detail="Nome de usuário já registrado")
     
-    db_usuario = db.query(models.Usuario).filter(models.Usuario.email == usuario.email).first()
+    db_usuario = await db.scalar(select(models.Usuario).where(models.Usuario.email == usuario.email))
     if db_usuario:
         raise HTTPException(status_code=400, detail="Email já registrado")
     
-    password_hash = security.gerar_hash_password(usuario.password)
+    password_hash = await security.gerar_hash_password_async(usuario.password)
     db_usuario = models.Usuario(
         username=usuario.username,
         email=usuario.email,
-        password_hash=password_hash
+        password_hash=password_hash,
+        personagens=[]
     )
     db.add(db_usuario)
-    db.commit()
-    db.refresh(db_usuario)
+    await db.commit()
     return db_usuario
 
+# Paginação por cursor (keyset) sobre Personagem.id
+LIMITE_PAGINA_PADRAO = 100
+LIMITE_PAGINA_MAXIMO = 500
+CABECALHO_CURSOR = "X-Proximo-Cursor"
+
+async def _pagina_personagens(db: AsyncSession, usuario_id: int, limit: int, after: Optional[int], incluir_itens: bool):
+    consulta = (
+        select(models.Personagem)
+        .where(models.Personagem.usuario_id == usuario_id)
+        .order_by(models.Personagem.id)
+        .limit(limit)
+    )
+    if after is not None:
+        consulta = consulta.where(models.Personagem.id > after)
+    if incluir_itens:
+        consulta = consulta.options(selectinload(models.Personagem.itens))
+    return (await db.scalars(consulta)).all()
+
+def _cabecalhos_cursor(quantidade: int, ultimo_id: Optional[int], limit: int) -> dict:
+    # Página cheia: pode haver mais personagens depois do último id
+    if quantidade == limit:
+        return {CABECALHO_CURSOR: str(ultimo_id)}
+    return {}
+
+def _usar_serializacao_rapida(incluir_itens: bool = True) -> bool:
+    # Sem itens a resposta já não corresponde ao response_model da rota
+    return configuracoes.serializacao_rapida or not incluir_itens
+
+async def _responder_perfil(
+    db: AsyncSession, response: Response, usuario, limit: int, after: Optional[int], incluir_itens: bool
+):
+    # Os personagens vêm paginados como em /personagens, com o cursor no cabeçalho
+    if _usar_serializacao_rapida(incluir_itens):
+        dados = await serializacao.pagina_personagens(db, usuario.id, limit, after, incluir_itens)
+        cabecalhos = _cabecalhos_cursor(len(dados), dados[-1]["id"] if dados else None, limit)
+        perfil = {
+            "username": usuario.username,
+            "email": usuario.email,
+            "id": usuario.id,
+            "personagens": dados,
+        }
+        adaptador = serializacao.ADAPTADOR_USUARIO if incluir_itens else None
+        return await serializacao.resposta(db, perfil, adaptador, headers=cabecalhos)
+
+    personagens = await _pagina_personagens(db, usuario.id, limit, after, incluir_itens)
+    response.headers.update(_cabecalhos_cursor(len(personagens), personagens[-1].id if personagens else None, limit))
+    return schemas.Usuario(
+        id=usuario.id,
+        username=usuario.username,
+        email=usuario.email,
+        personagens=[schemas.Personagem.model_validate(p) for p in personagens],
+    )
+
 # Rotas protegidas
-@app.get("/meu-perfil", response_model=schemas.Usuario)
-def ler_perfil(usuario_atual: models.Usuario = Depends(obter_usuario_atual)):
-    return usuario_atual
+@router.get("/meu-perfil", response_model=schemas.Usuario, dependencies=[LIMITE_LEITURA])
+async def ler_perfil(
+    response: Response,
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    after: Optional[int] = None,
+    incluir_itens: bool = True,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Username e email vêm do banco, não do cache de tokens: a invalidação
+    # após PUT /meu-perfil só alcança o worker que atendeu a alteração
+    usuario = (await db.execute(
+        select(models.Usuario.id, models.Usuario.username, models.Usuario.email).where(
+            models.Usuario.id == usuario_atual.id
+        )
+    )).first()
+    if usuario is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return await _responder_perfil(db, response, usuario, limit, after, incluir_itens)
 
-@app.put("/meu-perfil", response_model=schemas.Usuario)
-def atualizar_perfil(
+@router.put("/meu-perfil", response_model=schemas.Usuario, dependencies=[LIMITE_CARO])
+async def atualizar_perfil(
+    response: Response,
     usuario_atualizado: schemas.UsuarioAtualizar,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verifica se o username já está em uso por outro usuário
-    usuario_existente = db.query(models.Usuario).filter(
+    usuario_existente = await db.scalar(select(models.Usuario).where(
         models.Usuario.username == usuario_atualizado.username,
         models.Usuario.id != usuario_atual.id
-    ).first()
+    ))
     if usuario_existente:
         raise HTTPException(status_code=400, detail="Username já está em uso")
 
     # Verifica se o email já está em uso por outro usuário
-    usuario_existente = db.query(models.Usuario).filter(
+    usuario_existente = await db.scalar(select(models.Usuario).where(
         models.Usuario.email == usuario_atualizado.email,
         models.Usuario.id != usuario_atual.id
-    ).first()
+    ))
     if usuario_existente:
         raise HTTPException(status_code=400, detail="Email já está em uso")
 
-    usuario_atual.username = usuario_atualizado.username
-    usuario_atual.email = usuario_atualizado.email
+    db_usuario = await db.get(models.Usuario, usuario_atual.id)
+    db_usuario.username = usuario_atualizado.username
+    db_usuario.email = usuario_atualizado.email
 
     # Atualiza a senha apenas se uma nova senha foi fornecida
     if usuario_atualizado.password:
-        usuario_atual.password_hash = security.get_password_hash(usuario_atualizado.password)
+        db_usuario.password_hash = await security.gerar_hash_password_async(usuario_atualizado.password)
 
     try:
-        db.commit()
-        db.refresh(usuario_atual)
-        return usuario_atual
+        await db.commit()
+        # Tokens em cache apontam para os dados antigos do usuário
+        cache_usuarios.invalidar_usuario(usuario_atual.id)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail="Erro ao atualizar perfil. Por favor, tente novamente."
         ) from e
+    # Mesma primeira página de GET /meu-perfil, não o elenco inteiro
+    return await _responder_perfil(db, response, db_usuario, LIMITE_PAGINA_PADRAO, None, True)
 
-@app.get("/personagens", response_model=List[schemas.Personagem])
-def listar_personagens(usuario_atual: models.Usuario = Depends(obter_usuario_atual), db: Session = Depends(get_db)):
+@router.get("/meu-perfil/export", dependencies=[LIMITE_CARO])
+async def exportar_perfil(usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual)):
+    return StreamingResponse(
+        exportacao.exportar_ndjson(usuario_atual.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{usuario_atual.username}.ndjson"'},
+    )
+
+@router.post("/meu-perfil/import", response_model=schemas.ResultadoImportacao, dependencies=[LIMITE_CARO])
+async def importar_perfil(
+    request: Request,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        totais = await exportacao.importar_ndjson(db, usuario_atual.id, request.stream())
+        await db.commit()
+        return totais
+    except exportacao.ErroImportacao as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/estatisticas", response_model=schemas.EstatisticasUsuario, dependencies=[LIMITE_LEITURA])
+async def obter_estatisticas(
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await estatisticas.resumo_usuario(db, usuario_atual.id)
+
+@router.get("/personagens", response_model=List[schemas.Personagem], dependencies=[LIMITE_LEITURA])
+async def listar_personagens(
+    response: Response,
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    after: Optional[int] = None,
+    incluir_itens: bool = True,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        print(f"Buscando personagens para usuário {usuario_atual.id}")
-        personagens = db.query(models.Personagem).filter(models.Personagem.usuario_id == usuario_atual.id).all()
-        print(f"Personagens encontrados: {personagens}")
+        if _usar_serializacao_rapida(incluir_itens):
+            dados = await serializacao.pagina_personagens(db, usuario_atual.id, limit, after, incluir_itens)
+            cabecalhos = _cabecalhos_cursor(len(dados), dados[-1]["id"] if dados else None, limit)
+            adaptador = serializacao.ADAPTADOR_PERSONAGENS if incluir_itens else serializacao.ADAPTADOR_PERSONAGENS_RESUMO
+            return await serializacao.resposta(db, dados, adaptador, headers=cabecalhos)
+
+        personagens = await _pagina_personagens(db, usuario_atual.id, limit, after, incluir_itens)
+        response.headers.update(_cabecalhos_cursor(len(personagens), personagens[-1].id if personagens else None, limit))
         return personagens
     except Exception as e:
-        print(f"Erro ao listar personagens: {str(e)}")
-        db.rollback()
+        logger.exception("Erro ao listar personagens do usuário %s", usuario_atual.id)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao listar personagens: {str(e)}"
         )
 
-@app.post("/personagens", response_model=schemas.Personagem)
-def criar_personagem(
+@router.get(
+    "/sync",
+    response_model=schemas.ResultadoSincronizacao,
+    responses={410: {"description": "Cursor compactado ou desconhecido: refaça a carga completa a partir do cursor devolvido"}},
+    dependencies=[LIMITE_LEITURA],
+)
+async def sincronizar(
+    desde: int = Query(..., ge=0),
+    limit: int = Query(LIMITE_PAGINA_MAXIMO, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not sincronizacao.disponivel(db.bind.dialect.name):
+        raise HTTPException(status_code=501, detail="Sincronização incremental disponível apenas com SQLite")
+    atual = await sincronizacao.cursor_atual(db)
+    # Um cursor além da última alteração não foi emitido por este banco (ex.:
+    # banco restaurado de backup); devolvê-lo pularia as alterações até ele
+    if desde < await sincronizacao.compactado_ate(db) or desde > atual:
+        return JSONResponse(
+            status_code=status.HTTP_410_GONE,
+            content={
+                "detail": "Cursor muito antigo ou desconhecido. É necessária uma sincronização completa.",
+                "resincronizar": True,
+                "cursor": atual,
+            },
+        )
+    return await sincronizacao.alteracoes_desde(db, usuario_atual.id, desde, limit)
+
+@router.post("/personagens", response_model=schemas.Personagem, dependencies=[LIMITE_ESCRITA])
+async def criar_personagem(
     personagem: schemas.PersonagemCriar,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         if not personagem.nome or not personagem.classe:
@@ -192,10 +403,10 @@ def criar_personagem(
             )
 
         # Verifica se já existe um personagem com o mesmo nome para este usuário
-        existing_personagem = db.query(models.Personagem).filter(
+        existing_personagem = await db.scalar(select(models.Personagem).where(
             models.Personagem.nome == personagem.nome,
             models.Personagem.usuario_id == usuario_atual.id
-        ).first()
+        ))
         if existing_personagem:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -203,113 +414,404 @@ def criar_personagem(
             )
 
         # Cria o personagem
-        db_personagem = models.Personagem(**personagem.dict(), usuario_id=usuario_atual.id)
+        db_personagem = models.Personagem(**personagem.model_dump(), usuario_id=usuario_atual.id, itens=[])
         db.add(db_personagem)
-        db.commit()
-        db.refresh(db_personagem)
+        await db.flush()
+        await estatisticas.registrar_classes(db, usuario_atual.id, Counter([db_personagem.classe]))
+        await sincronizacao.registrar(
+            db, usuario_atual.id, sincronizacao.PERSONAGEM, sincronizacao.CRIAR, [(db_personagem.id, db_personagem.id)]
+        )
+        await db.commit()
+        # O SQLite pode reaproveitar o id de um personagem removido
+        cache_respostas.invalidar_personagem(usuario_atual.id, db_personagem.id)
         return db_personagem
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao criar personagem. Por favor, tente novamente."
         ) from e
 
-@app.get("/personagens/{personagem_id}", response_model=schemas.Personagem)
-def obter_personagem(
+# GET condicional: o ETag deriva de Personagem.versao, então um If-None-Match
+# válido é respondido com 304 sem carregar nenhum item
+def _parametros(request: Request) -> str:
+    return "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+def _etag(prefixo: str, personagem_id: int, versao: int, request: Request) -> str:
+    etag = f"{prefixo}{personagem_id}-v{versao}"
+    if request.query_params:
+        etag += "-" + hashlib.sha1(_parametros(request).encode("utf-8")).hexdigest()[:12]
+    return f'"{etag}"'
+
+def _etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [candidato.strip() for candidato in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+async def _versao_ou_404(db: AsyncSession, personagem_id: int, usuario_id: int) -> int:
+    versao = await inventario.versao_personagem(db, personagem_id, usuario_id)
+    if versao is None:
+        raise HTTPException(status_code=404, detail="Personagem não encontrado")
+    return versao
+
+# Cache de respostas: depois da consulta de versão (a mesma do ETag), um
+# acerto devolve os bytes já codificados sem carregar nem serializar nada
+def _chave_cache(prefixo: str, personagem_id: int, usuario_id: int, request: Request):
+    if not cache_respostas.ativo:
+        return None
+    return (usuario_id, personagem_id, f"{prefixo}?{_parametros(request)}")
+
+def _resposta_bytes(corpo: bytes, cabecalhos: dict) -> Response:
+    return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+async def _guardar_e_responder(db: AsyncSession, chave, etag: str, dados, adaptador, cabecalhos: dict) -> Response:
+    corpo = await serializacao.codificar(db, dados, adaptador)
+    cache_respostas.guardar(chave, etag, corpo, cabecalhos)
+    return _resposta_bytes(corpo, cabecalhos)
+
+@router.post("/personagens/gerar", response_model=schemas.ResultadoGeracao, dependencies=[LIMITE_CARO])
+async def gerar_personagens(
+    parametros: schemas.GerarPersonagens,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if parametros.nivel_minimo > parametros.nivel_maximo or parametros.itens_minimo > parametros.itens_maximo:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Os valores mínimos não podem ser maiores que os máximos"
+        )
+    semente = parametros.semente if parametros.semente is not None else gerador.nova_semente()
+    # A numeração continua a partir dos personagens existentes para evitar nomes repetidos
+    existentes = await db.scalar(
+        select(func.count()).select_from(models.Personagem).where(models.Personagem.usuario_id == usuario_atual.id)
+    )
+    personagens, itens = gerador.gerar_elenco(
+        random.Random(semente),
+        parametros.quantidade,
+        nivel_minimo=parametros.nivel_minimo,
+        nivel_maximo=parametros.nivel_maximo,
+        itens_minimo=parametros.itens_minimo,
+        itens_maximo=parametros.itens_maximo,
+        classes=parametros.classes,
+        inicio_numeracao=existentes + 1,
+    )
+    try:
+        totais = await gerador.inserir_elenco(db, usuario_atual.id, personagens, itens)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao gerar personagens. Por favor, tente novamente."
+        ) from e
+    return {"semente": semente, **totais}
+
+@router.get("/personagens/{personagem_id}", response_model=schemas.Personagem, dependencies=[LIMITE_LEITURA])
+async def obter_personagem(
     personagem_id: int,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    personagem = db.query(models.Personagem).filter(
+    versao = await _versao_ou_404(db, personagem_id, usuario_atual.id)
+    etag = _etag("p", personagem_id, versao, request)
+    if _etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    chave = _chave_cache("p", personagem_id, usuario_atual.id, request)
+    if chave is not None:
+        em_cache = cache_respostas.obter(chave, etag)
+        if em_cache is not None:
+            return _resposta_bytes(em_cache.corpo, em_cache.cabecalhos)
+
+    if chave is not None or _usar_serializacao_rapida():
+        dados = await serializacao.personagem(db, personagem_id, usuario_atual.id)
+        if dados is None:
+            raise HTTPException(status_code=404, detail="Personagem não encontrado")
+        if chave is not None:
+            return await _guardar_e_responder(db, chave, etag, dados, serializacao.ADAPTADOR_PERSONAGEM, {"ETag": etag})
+        return await serializacao.resposta(db, dados, serializacao.ADAPTADOR_PERSONAGEM, headers={"ETag": etag})
+
+    personagem = await db.scalar(select(models.Personagem).where(
         models.Personagem.id == personagem_id,
         models.Personagem.usuario_id == usuario_atual.id
-    ).first()
+    ).options(selectinload(models.Personagem.itens)))
     if not personagem:
         raise HTTPException(status_code=404, detail="Personagem não encontrado")
+    # Se houve escrita entre as duas consultas o corpo é mais novo que o ETag,
+    # e a próxima requisição condicional simplesmente recebe 200 de novo
+    response.headers["ETag"] = etag
     return personagem
 
-@app.get("/personagens/{personagem_id}/inventario", response_model=List[schemas.Item])
-def obter_inventario(
+@router.get("/personagens/{personagem_id}/estatisticas", response_model=schemas.EstatisticasPersonagem, dependencies=[LIMITE_LEITURA])
+async def obter_estatisticas_personagem(
     personagem_id: int,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    personagem = db.query(models.Personagem).filter(
-        models.Personagem.id == personagem_id,
-        models.Personagem.usuario_id == usuario_atual.id
-    ).first()
-    if not personagem:
+    if not await inventario.personagem_pertence_ao_usuario(db, personagem_id, usuario_atual.id):
         raise HTTPException(status_code=404, detail="Personagem não encontrado")
-    return personagem.itens
+    return await estatisticas.resumo_personagem(db, personagem_id)
+
+def _proximo_prefixo(prefixo: str) -> Optional[str]:
+    """Menor texto maior que todos os que começam com ``prefixo`` (None se não houver).
+
+    Incrementa o último caractere: na ordem por code point (a dos bytes UTF-8
+    comparados pelo SQLite) isso cobre qualquer sufixo, inclusive acima de U+FFFF.
+    """
+    caracteres = list(prefixo)
+    while caracteres:
+        ponto = ord(caracteres.pop()) + 1
+        if 0xD800 <= ponto <= 0xDFFF:
+            # Surrogates não existem em UTF-8
+            ponto = 0xE000
+        if ponto <= 0x10FFFF:
+            return "".join(caracteres) + chr(ponto)
+    return None
 
-@app.post("/personagens/{personagem_id}/inventario", response_model=schemas.Item)
-def adicionar_item(
+@router.get("/personagens/{personagem_id}/inventario", response_model=List[schemas.Item], dependencies=[LIMITE_LEITURA])
+async def obter_inventario(
+    personagem_id: int,
+    request: Request,
+    response: Response,
+    tipo: Optional[str] = None,
+    nome_prefixo: Optional[str] = Query(None, min_length=1),
+    ordenar_por: Literal["id", "nome", "tipo"] = "id",
+    ordem: Literal["asc", "desc"] = "asc",
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    offset: int = Query(0, ge=0),
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    versao = await _versao_ou_404(db, personagem_id, usuario_atual.id)
+    etag = _etag("i", personagem_id, versao, request)
+    if _etag_confere(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    chave = _chave_cache("i", personagem_id, usuario_atual.id, request)
+    if chave is not None:
+        em_cache = cache_respostas.obter(chave, etag)
+        if em_cache is not None:
+            return _resposta_bytes(em_cache.corpo, em_cache.cabecalhos)
+
+    consulta = select(models.Item).where(models.Item.personagem_id == personagem_id)
+    if tipo is not None:
+        consulta = consulta.where(models.Item.tipo == tipo)
+    if nome_prefixo is not None:
+        # Intervalo em vez de LIKE para aproveitar o índice (personagem_id, nome)
+        consulta = consulta.where(models.Item.nome >= nome_prefixo)
+        limite_superior = _proximo_prefixo(nome_prefixo)
+        if limite_superior is not None:
+            consulta = consulta.where(models.Item.nome < limite_superior)
+    coluna = getattr(models.Item, ordenar_por)
+    if ordem == "desc":
+        consulta = consulta.order_by(coluna.desc(), models.Item.id.desc())
+    else:
+        consulta = consulta.order_by(coluna, models.Item.id)
+    consulta = consulta.limit(limit).offset(offset)
+    cabecalhos = {"ETag": etag}
+
+    if chave is not None or _usar_serializacao_rapida():
+        dados = await serializacao.linhas_como_dicts(db, consulta.with_only_columns(*serializacao.COLUNAS_ITEM))
+        if len(dados) == limit:
+            cabecalhos["X-Proximo-Offset"] = str(offset + limit)
+        if chave is not None:
+            return await _guardar_e_responder(db, chave, etag, dados, serializacao.ADAPTADOR_ITENS, cabecalhos)
+        return await serializacao.resposta(db, dados, serializacao.ADAPTADOR_ITENS, headers=cabecalhos)
+
+    itens = (await db.scalars(consulta)).all()
+    if len(itens) == limit:
+        cabecalhos["X-Proximo-Offset"] = str(offset + limit)
+    response.headers.update(cabecalhos)
+    return itens
+
+@router.get("/itens/busca", response_model=List[schemas.ItemBusca], dependencies=[LIMITE_LEITURA])
+async def buscar_itens(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO),
+    offset: int = Query(0, ge=0),
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not busca.disponivel(db.bind.dialect.name):
+        raise HTTPException(status_code=501, detail="Busca textual disponível apenas com SQLite")
+    itens = await busca.buscar_itens(db, usuario_atual.id, q, limit, offset)
+    if len(itens) == limit:
+        response.headers["X-Proximo-Offset"] = str(offset + limit)
+    return itens
+
+async def _escrever_inventario(db: AsyncSession, operacao, usuario_id: int, personagem_id: int, dados):
+    # Toda escrita no inventário descarta as respostas em cache do personagem
+    resultado = await escrita.escrever(db, operacao, usuario_id, personagem_id, dados)
+    cache_respostas.invalidar_personagem(usuario_id, personagem_id)
+    return resultado
+
+@router.post("/personagens/{personagem_id}/inventario", response_model=schemas.Item, dependencies=[LIMITE_ESCRITA])
+async def adicionar_item(
     personagem_id: int,
     item: schemas.ItemCriar,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    personagem = db.query(models.Personagem).filter(
-        models.Personagem.id == personagem_id,
-        models.Personagem.usuario_id == usuario_atual.id
-    ).first()
-    if not personagem:
+    if not await inventario.personagem_pertence_ao_usuario(db, personagem_id, usuario_atual.id):
         raise HTTPException(status_code=404, detail="Personagem não encontrado")
     
-    db_item = models.Item(**item.dict(), personagem_id=personagem_id)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    [db_item] = await _escrever_inventario(db, inventario.inserir_itens, usuario_atual.id, personagem_id, [item.model_dump()])
     return db_item
 
-@app.put("/personagens/{personagem_id}/inventario/{item_id}", response_model=schemas.Item)
-def atualizar_item(
+# Operações em lote: uma verificação de posse, uma instrução e um commit por requisição
+# (ou um lugar no lote compartilhado, com escrita agrupada)
+LIMITE_LOTE = schemas.LIMITE_LOTE
+
+async def _verificar_personagem_lote(db: AsyncSession, personagem_id: int, usuario_id: int):
+    if not await inventario.personagem_pertence_ao_usuario(db, personagem_id, usuario_id):
+        raise HTTPException(status_code=404, detail="Personagem não encontrado")
+
+async def _validar_corpo(request: Request, adaptador: TypeAdapter):
+    # Valida os bytes do corpo direto no pydantic-core, em vez do json.loads
+    # seguido da validação do parâmetro Body pelo FastAPI
+    try:
+        return adaptador.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**erro, "loc": ("body", *erro["loc"])} for erro in e.errors()]
+        )
+
+def _corpo_openapi(adaptador: TypeAdapter) -> dict:
+    # Documenta o corpo lido por _validar_corpo, com as definições embutidas
+    esquema = adaptador.json_schema()
+    definicoes = esquema.pop("$defs", {})
+
+    def resolver(no):
+        if isinstance(no, dict):
+            if "$ref" in no:
+                return resolver(definicoes[no["$ref"].rsplit("/", 1)[-1]])
+            return {chave: resolver(valor) for chave, valor in no.items()}
+        if isinstance(no, list):
+            return [resolver(valor) for valor in no]
+        return no
+
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": resolver(esquema)}}}}
+
+@router.post(
+    "/personagens/{personagem_id}/inventario/lote",
+    response_model=List[schemas.ResultadoItemLote],
+    dependencies=[LIMITE_CARO],
+    openapi_extra=_corpo_openapi(schemas.ADAPTADOR_ITENS_CRIAR),
+)
+async def adicionar_itens_lote(
+    personagem_id: int,
+    request: Request,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    itens = await _validar_corpo(request, schemas.ADAPTADOR_ITENS_CRIAR)
+    await _verificar_personagem_lote(db, personagem_id, usuario_atual.id)
+    db_itens = await _escrever_inventario(
+        db, inventario.inserir_itens, usuario_atual.id, personagem_id, schemas.ADAPTADOR_ITENS_CRIAR.dump_python(itens)
+    )
+    return [{"id": db_item["id"], "sucesso": True, "item": db_item} for db_item in db_itens]
+
+@router.put(
+    "/personagens/{personagem_id}/inventario/lote",
+    response_model=List[schemas.ResultadoItemLote],
+    dependencies=[LIMITE_CARO],
+    openapi_extra=_corpo_openapi(schemas.ADAPTADOR_ITENS_ATUALIZAR),
+)
+async def atualizar_itens_lote(
+    personagem_id: int,
+    request: Request,
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    itens = await _validar_corpo(request, schemas.ADAPTADOR_ITENS_ATUALIZAR)
+    await _verificar_personagem_lote(db, personagem_id, usuario_atual.id)
+    atualizados = await _escrever_inventario(
+        db, inventario.atualizar_itens, usuario_atual.id, personagem_id, schemas.ADAPTADOR_ITENS_ATUALIZAR.dump_python(itens)
+    )
+    return [
+        {"id": item.id, "sucesso": True, "item": atualizados[item.id]}
+        if item.id in atualizados
+        else {"id": item.id, "sucesso": False, "erro": "Item não encontrado"}
+        for item in itens
+    ]
+
+@router.delete("/personagens/{personagem_id}/inventario/lote", response_model=List[schemas.ResultadoItemLote], dependencies=[LIMITE_CARO])
+async def deletar_itens_lote(
+    personagem_id: int,
+    ids: List[int] = Body(..., min_length=1, max_length=LIMITE_LOTE),
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await _verificar_personagem_lote(db, personagem_id, usuario_atual.id)
+    removidos = await _escrever_inventario(db, inventario.remover_itens, usuario_atual.id, personagem_id, ids)
+    return [
+        {"id": item_id, "sucesso": True}
+        if item_id in removidos
+        else {"id": item_id, "sucesso": False, "erro": "Item não encontrado"}
+        for item_id in ids
+    ]
+
+@router.put("/personagens/{personagem_id}/inventario/{item_id}", response_model=schemas.Item, dependencies=[LIMITE_ESCRITA])
+async def atualizar_item(
     personagem_id: int,
     item_id: int,
     item: schemas.ItemCriar,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_item = db.query(models.Item).join(models.Personagem).filter(
-        models.Item.id == item_id,
-        models.Personagem.id == personagem_id,
-        models.Personagem.usuario_id == usuario_atual.id
-    ).first()
+    atualizados = await _escrever_inventario(
+        db, inventario.atualizar_itens, usuario_atual.id, personagem_id, [{**item.model_dump(), "id": item_id}]
+    )
     
-    if not db_item:
+    if item_id not in atualizados:
         raise HTTPException(status_code=404, detail="Item não encontrado")
     
-    for key, value in item.dict().items():
-        setattr(db_item, key, value)
-    
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+    return atualizados[item_id]
 
-@app.delete("/personagens/{personagem_id}/inventario/{item_id}")
-def deletar_item(
+@router.delete("/personagens/{personagem_id}/inventario/{item_id}", dependencies=[LIMITE_ESCRITA])
+async def deletar_item(
     personagem_id: int,
     item_id: int,
-    usuario_atual: models.Usuario = Depends(obter_usuario_atual),
-    db: Session = Depends(get_db)
+    usuario_atual: UsuarioAutenticado = Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_item = db.query(models.Item).join(models.Personagem).filter(
-        models.Item.id == item_id,
-        models.Personagem.id == personagem_id,
-        models.Personagem.usuario_id == usuario_atual.id
-    ).first()
+    removidos = await _escrever_inventario(db, inventario.remover_itens, usuario_atual.id, personagem_id, [item_id])
     
-    if not db_item:
+    if not removidos:
         raise HTTPException(status_code=404, detail="Item não encontrado")
     
-    db.delete(db_item)
-    db.commit()
     return {"mensagem": "Item deletado com sucesso"}
 
+def criar_app() -> FastAPI:
+    app = FastAPI(title="Simulador de Inventário de RPG", lifespan=lifespan)
+
+    # Configuração do CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=3600,
+    )
+    app.add_middleware(metricas.MiddlewareMetricas)
+    app.add_exception_handler(security.FilaHashCheiaError, fila_hash_cheia_handler)
+    app.add_exception_handler(limitador.LimiteExcedidoError, limite_excedido_handler)
+    app.include_router(router)
+    return app
+
+app = criar_app()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000, reload=True)
+    # Desenvolvimento: um processo com reload; em produção use python -m app.servidor
+    migracoes.migrar(engine)
+    uvicorn.run("app.main:criar_app", factory=True, host="127.0.0.1", port=8000, reload=True)
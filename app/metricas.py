@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .config import configuracoes
+
+logger = logging.getLogger(__name__)
+
+# Métricas por requisição: latência por rota, quantidade e tempo das consultas
+# SQL emitidas (para tornar padrões N+1 visíveis), exportadas em formato
+# texto do Prometheus em /metrics.
+
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BALDES_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+TAMANHO_MAXIMO_SQL_LOG = 200
+
+class ConsultasRequisicao:
+    """Consultas SQL emitidas durante uma requisição, agrupadas por instrução."""
+
+    __slots__ = ("quantidade", "segundos", "por_instrucao")
+
+    def __init__(self):
+        self.quantidade = 0
+        self.segundos = 0.0
+        self.por_instrucao: Dict[str, List[float]] = {}
+
+    def registrar(self, instrucao: str, segundos: float) -> None:
+        self.quantidade += 1
+        self.segundos += segundos
+        total = self.por_instrucao.get(instrucao)
+        if total is None:
+            self.por_instrucao[instrucao] = [1, segundos]
+        else:
+            total[0] += 1
+            total[1] += segundos
+
+_consultas_atuais: ContextVar[Optional[ConsultasRequisicao]] = ContextVar("consultas_atuais", default=None)
+
+class Histograma:
+    __slots__ = ("baldes", "contagens", "soma", "total")
+
+    def __init__(self, baldes: Iterable[float]):
+        self.baldes = tuple(baldes)
+        self.contagens = [0] * len(self.baldes)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.baldes):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+
+    def acumulado(self) -> List[Tuple[str, int]]:
+        linhas = []
+        acumulado = 0
+        for limite, contagem in zip(self.baldes, self.contagens):
+            acumulado += contagem
+            linhas.append((str(limite), acumulado))
+        linhas.append(("+Inf", self.total))
+        return linhas
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(**rotulos) -> str:
+    return ",".join(f'{nome}="{_escapar(str(valor))}"' for nome, valor in rotulos.items())
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencia: Dict[Tuple[str, str], Histograma] = {}
+        self.consultas: Dict[Tuple[str, str], Histograma] = {}
+        self.segundos_sql: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.requisicoes: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        # Coletores extras (ex.: caches), chamados a cada exportação
+        self._coletores = []
+
+    def adicionar_coletor(self, coletor) -> None:
+        self._coletores.append(coletor)
+
+    def observar(self, metodo: str, rota: str, status: int, segundos: float, consultas: ConsultasRequisicao) -> None:
+        chave = (metodo, rota)
+        with self._lock:
+            if chave not in self.latencia:
+                self.latencia[chave] = Histograma(BALDES_LATENCIA)
+                self.consultas[chave] = Histograma(BALDES_CONSULTAS)
+            self.latencia[chave].observar(segundos)
+            self.consultas[chave].observar(consultas.quantidade)
+            self.segundos_sql[chave] += consultas.segundos
+            self.requisicoes[(metodo, rota, status)] += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self.latencia.clear()
+            self.consultas.clear()
+            self.segundos_sql.clear()
+            self.requisicoes.clear()
+
+    def exportar_prometheus(self) -> str:
+        linhas: List[str] = []
+        with self._lock:
+            linhas += [
+                "# HELP rpg_requisicoes_total Requisições HTTP atendidas.",
+                "# TYPE rpg_requisicoes_total counter",
+            ]
+            for (metodo, rota, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f"rpg_requisicoes_total{{{_rotulos(metodo=metodo, rota=rota, status=status)}}} {total}")
+            self._exportar_histogramas(
+                linhas, "rpg_requisicao_duracao_segundos", "Latência das requisições HTTP.", self.latencia
+            )
+            self._exportar_histogramas(
+                linhas, "rpg_requisicao_consultas_sql", "Consultas SQL emitidas por requisição.", self.consultas
+            )
+            linhas += [
+                "# HELP rpg_requisicao_sql_segundos_total Tempo gasto em consultas SQL por rota.",
+                "# TYPE rpg_requisicao_sql_segundos_total counter",
+            ]
+            for (metodo, rota), segundos in sorted(self.segundos_sql.items()):
+                linhas.append(f"rpg_requisicao_sql_segundos_total{{{_rotulos(metodo=metodo, rota=rota)}}} {segundos!r}")
+        for coletor in self._coletores:
+            for nome, tipo, ajuda, valores in coletor():
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+                for rotulos, valor in valores:
+                    sufixo = f"{{{_rotulos(**rotulos)}}}" if rotulos else ""
+                    linhas.append(f"{nome}{sufixo} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    @staticmethod
+    def _exportar_histogramas(linhas: List[str], nome: str, ajuda: str, histogramas: Dict[Tuple[str, str], Histograma]) -> None:
+        linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+        for (metodo, rota), histograma in sorted(histogramas.items()):
+            for limite, acumulado in histograma.acumulado():
+                linhas.append(f"{nome}_bucket{{{_rotulos(metodo=metodo, rota=rota, le=limite)}}} {acumulado}")
+            linhas.append(f"{nome}_sum{{{_rotulos(metodo=metodo, rota=rota)}}} {histograma.soma!r}")
+            linhas.append(f"{nome}_count{{{_rotulos(metodo=metodo, rota=rota)}}} {histograma.total}")
+
+registro = RegistroMetricas()
+
+def instrumentar_engine(engine_sync) -> None:
+    @event.listens_for(engine_sync, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._rpg_inicio_consulta = time.perf_counter()
+
+    @event.listens_for(engine_sync, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        consultas = _consultas_atuais.get()
+        inicio = getattr(context, "_rpg_inicio_consulta", None)
+        if consultas is None or inicio is None:
+            return
+        consultas.registrar(statement, time.perf_counter() - inicio)
+
+
+def _registrar_lenta(metodo: str, rota: str, status: int, segundos: float, consultas: ConsultasRequisicao) -> None:
+    detalhes = sorted(consultas.por_instrucao.items(), key=lambda item: item[1][1], reverse=True)
+    linhas = [
+        f"  {quantidade}x {tempo * 1000:.2f} ms  {' '.join(instrucao.split())[:TAMANHO_MAXIMO_SQL_LOG]}"
+        for instrucao, (quantidade, tempo) in detalhes
+    ]
+    logger.warning(
+        "Requisição lenta: %s %s -> %s em %.1f ms, %d consultas SQL (%.1f ms)\n%s",
+        metodo, rota, status, segundos * 1000, consultas.quantidade, consultas.segundos * 1000, "\n".join(linhas),
+    )
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mede cada requisição HTTP e as consultas SQL emitidas por ela."""
+
+    def __init__(self, app):
+        self.app = app
+        self._rotas_por_endpoint: Dict[object, str] = {}
+
+    def _nome_rota(self, scope) -> str:
+        # Usa o molde da rota (ex.: /personagens/{personagem_id}) para não explodir a cardinalidade
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "nao_encontrada"
+        rota = self._rotas_por_endpoint.get(endpoint)
+        if rota is None:
+            for candidata in scope["app"].routes:
+                if getattr(candidata, "endpoint", None) is endpoint:
+                    rota = candidata.path_format
+                    break
+            else:
+                rota = getattr(endpoint, "__name__", "desconhecida")
+            self._rotas_por_endpoint[endpoint] = rota
+        return rota
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        consultas = ConsultasRequisicao()
+        token = _consultas_atuais.set(consultas)
+        status_resposta = 500
+
+        async def enviar(mensagem):
+            nonlocal status_resposta
+            if mensagem["type"] == "http.response.start":
+                status_resposta = mensagem["status"]
+            await send(mensagem)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            segundos = time.perf_counter() - inicio
+            _consultas_atuais.reset(token)
+            metodo = scope["method"]
+            rota = self._nome_rota(scope)
+            registro.observar(metodo, rota, status_resposta, segundos, consultas)
+            limite = configuracoes.metricas_requisicao_lenta_ms
+            if limite is not None and segundos * 1000 >= limite:
+                _registrar_lenta(metodo, rota, status_resposta, segundos, consultas)
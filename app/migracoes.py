@@ -0,0 +1,55 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from . import busca, estatisticas, models, sincronizacao
+from .database import engine
+
+# Migração do esquema de bancos existentes (ex.: rpg_inventory.db antigos).
+# create_all só cria tabelas ausentes; colunas e índices novos em tabelas já
+# existentes precisam ser criados à parte. Todas as etapas são idempotentes.
+# Uso: python -m app.migracoes
+
+def _adicionar_colunas(conexao) -> None:
+    inspetor = inspect(conexao)
+    preparador = conexao.dialect.identifier_preparer
+    for tabela in models.Base.metadata.sorted_tables:
+        existentes = {coluna["name"] for coluna in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in existentes:
+                continue
+            ddl = "ALTER TABLE {} ADD COLUMN {} {}".format(
+                preparador.format_table(tabela),
+                preparador.format_column(coluna),
+                coluna.type.compile(dialect=conexao.dialect),
+            )
+            if coluna.server_default is not None:
+                ddl += f" DEFAULT {coluna.server_default.arg}"
+            if not coluna.nullable:
+                ddl += " NOT NULL"
+            conexao.execute(text(ddl))
+
+def _criar_indices(conexao) -> None:
+    for tabela in models.Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(conexao, checkfirst=True)
+
+def migrar(bind: Engine = engine) -> None:
+    tabelas_existentes = set(inspect(bind).get_table_names())
+    models.Base.metadata.create_all(bind=bind)
+    with bind.begin() as conexao:
+        _adicionar_colunas(conexao)
+        _criar_indices(conexao)
+        # Tabelas de contadores recém-criadas precisam refletir os dados já existentes
+        if any(modelo.__tablename__ not in tabelas_existentes for modelo in estatisticas.TABELAS_CONTAGEM):
+            estatisticas.reconstruir(conexao)
+        # Dados anteriores ao registro de alterações entram nele como criados
+        if models.Alteracao.__tablename__ not in tabelas_existentes:
+            sincronizacao.preencher(conexao)
+        busca.instalar(conexao)
+        if conexao.dialect.name == "sqlite":
+            # Atualiza as estatísticas usadas pelo planejador de consultas
+            conexao.execute(text("ANALYZE"))
+
+if __name__ == "__main__":
+    migrar()
+    print("Esquema do banco de dados atualizado")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -14,18 +14,30 @@ class Usuario(Base):
 
 class Personagem(Base):
     __tablename__ = "personagens"
+    __table_args__ = (
+        # Verificação de posse e nomes duplicados por usuário
+        Index("ix_personagens_usuario_id_nome", "usuario_id", "nome"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, index=True)
     classe = Column(String)
     nivel = Column(Integer, default=1)
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
+    # Incrementada a cada alteração no personagem ou no inventário (usada nos ETags)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
     
     dono = relationship("Usuario", back_populates="personagens")
-    itens = relationship("Item", back_populates="personagem")
+    # Mesma ordem do caminho rápido e do cache de respostas (serializacao.anexar_itens)
+    itens = relationship("Item", back_populates="personagem", order_by="Item.id")
 
 class Item(Base):
     __tablename__ = "itens"
+    __table_args__ = (
+        # Consultas de inventário filtradas por tipo ou prefixo de nome
+        Index("ix_itens_personagem_id_tipo", "personagem_id", "tipo"),
+        Index("ix_itens_personagem_id_nome", "personagem_id", "nome"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, index=True)
@@ -34,3 +46,49 @@ class Item(Base):
     personagem_id = Column(Integer, ForeignKey("personagens.id"))
     
     personagem = relationship("Personagem", back_populates="itens")
+
+# Contadores mantidos a cada escrita (ver app/estatisticas.py)
+class ContagemItensPersonagem(Base):
+    __tablename__ = "contagens_itens_personagem"
+
+    personagem_id = Column(Integer, ForeignKey("personagens.id"), primary_key=True)
+    tipo = Column(String, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class ContagemItensUsuario(Base):
+    __tablename__ = "contagens_itens_usuario"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    tipo = Column(String, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+class ContagemClassesUsuario(Base):
+    __tablename__ = "contagens_classes_usuario"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    classe = Column(String, primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+
+# Registro de alterações para a sincronização incremental (ver app/sincronizacao.py)
+class Alteracao(Base):
+    __tablename__ = "alteracoes"
+    __table_args__ = (
+        Index("ix_alteracoes_usuario_id_id", "usuario_id", "id"),
+        # AUTOINCREMENT: ids removidos na compactação nunca voltam a ser usados
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    entidade = Column(String, nullable=False)  # personagem ou item
+    entidade_id = Column(Integer, nullable=False)
+    personagem_id = Column(Integer, nullable=False)
+    operacao = Column(String, nullable=False)  # criar, atualizar ou remover
+    criado_em = Column(DateTime, nullable=False, server_default=func.now())
+
+class EstadoSincronizacao(Base):
+    __tablename__ = "estado_sincronizacao"
+
+    id = Column(Integer, primary_key=True)
+    # Alterações com id até este valor podem ter sido compactadas
+    compactado_ate = Column(Integer, nullable=False, default=0)
@@ -1,7 +1,22 @@
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter, field_validator, model_validator
+from typing import Annotated, Dict, Optional, List
 import re
 
+# Padrões compilados uma única vez, na importação
+PADRAO_USERNAME = re.compile(r'^[a-zA-Z0-9_]+$')
+REGRAS_SENHA = (
+    (re.compile(r'[A-Z]'), 'A senha deve conter pelo menos uma letra maiúscula'),
+    (re.compile(r'[a-z]'), 'A senha deve conter pelo menos uma letra minúscula'),
+    (re.compile(r'[0-9]'), 'A senha deve conter pelo menos um número'),
+    (re.compile(r'[!@#$%^&*(),.?":{}|<>]'), 'A senha deve conter pelo menos um caractere especial'),
+)
+
+def _validar_regras_senha(v: str) -> str:
+    for padrao, mensagem in REGRAS_SENHA:
+        if not padrao.search(v):
+            raise ValueError(mensagem)
+    return v
+
 class ItemBase(BaseModel):
     nome: str
     descricao: str
@@ -11,11 +26,22 @@ class ItemCriar(ItemBase):
     pass
 
 class Item(ItemBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     personagem_id: int
 
-    class Config:
-        from_attributes = True
+class ItemAtualizarLote(ItemBase):
+    id: int
+
+class ResultadoItemLote(BaseModel):
+    id: Optional[int] = None
+    sucesso: bool
+    item: Optional[Item] = None
+    erro: Optional[str] = None
+
+class ItemBusca(Item):
+    relevancia: float
 
 class PersonagemBase(BaseModel):
     nome: str
@@ -25,28 +51,73 @@ class PersonagemBase(BaseModel):
 class PersonagemCriar(PersonagemBase):
     pass
 
-class Personagem(PersonagemBase):
+class PersonagemResumo(PersonagemBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     usuario_id: int
+
+class Personagem(PersonagemResumo):
     itens: List[Item] = []
 
-    class Config:
-        from_attributes = True
-        orm_mode = True
+class PersonagemImportar(PersonagemCriar):
+    itens: List[ItemCriar] = []
+
+class ResultadoImportacao(BaseModel):
+    personagens: int
+    itens: int
+    ignorados: int
+
+class GerarPersonagens(BaseModel):
+    quantidade: int = Field(..., ge=1, le=5000)
+    semente: Optional[int] = None
+    nivel_minimo: int = Field(1, ge=1, le=100)
+    nivel_maximo: int = Field(20, ge=1, le=100)
+    itens_minimo: int = Field(0, ge=0, le=50)
+    itens_maximo: int = Field(5, ge=0, le=50)
+    classes: Optional[List[str]] = None
+
+class ResultadoGeracao(BaseModel):
+    semente: int
+    personagens: int
+    itens: int
+    ignorados: int
+    ids: List[int]
+
+class EstatisticasUsuario(BaseModel):
+    personagens: int
+    itens: int
+    personagens_por_classe: Dict[str, int]
+    itens_por_tipo: Dict[str, int]
+
+class EstatisticasPersonagem(BaseModel):
+    personagem_id: int
+    itens: int
+    itens_por_tipo: Dict[str, int]
+
+class ResultadoSincronizacao(BaseModel):
+    cursor: int
+    mais: bool
+    personagens: List[PersonagemResumo]
+    itens: List[Item]
+    personagens_removidos: List[int]
+    itens_removidos: List[int]
 
 class UsuarioBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     email: EmailStr
 
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
         if not v.strip():
             raise ValueError('O nome de usuário não pode estar vazio')
-        if not re.match(r'^[a-zA-Z0-9_]+$', v):
+        if not PADRAO_USERNAME.match(v):
             raise ValueError('O nome de usuário deve conter apenas letras, números e _')
         return v
 
-    @validator('email')
+    @field_validator('email')
+    @classmethod
     def validate_email(cls, v):
         if not v.strip():
             raise ValueError('O email não pode estar vazio')
@@ -58,59 +129,62 @@ class UsuarioAtualizar(BaseModel):
     password: Optional[str] = None
     confirmar_password: Optional[str] = None
 
-    @validator('password')
-    def validate_password(cls, v, values):
+    @field_validator('password')
+    @classmethod
+    def validate_password(cls, v):
         if v is not None:
             if len(v) < 8:
                 raise ValueError('A senha deve ter pelo menos 8 caracteres')
-            if not re.search(r'[A-Z]', v):
-                raise ValueError('A senha deve conter pelo menos uma letra maiúscula')
-            if not re.search(r'[a-z]', v):
-                raise ValueError('A senha deve conter pelo menos uma letra minúscula')
-            if not re.search(r'[0-9]', v):
-                raise ValueError('A senha deve conter pelo menos um número')
-            if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-                raise ValueError('A senha deve conter pelo menos um caractere especial')
-            if 'confirmar_password' in values and v != values['confirmar_password']:
-                raise ValueError('As senhas não coincidem')
+            _validar_regras_senha(v)
         return v
 
+    @model_validator(mode='after')
+    def passwords_match(self):
+        # Depois de todos os campos: a confirmação vem depois da senha no schema
+        if self.password is not None and self.password != self.confirmar_password:
+            raise ValueError('As senhas não coincidem')
+        return self
+
 class UsuarioCriar(UsuarioBase):
     password: str = Field(..., min_length=8)
     confirmar_password: str
 
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password(cls, v):
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('A senha deve conter pelo menos uma letra maiúscula')
-        if not re.search(r'[a-z]', v):
-            raise ValueError('A senha deve conter pelo menos uma letra minúscula')
-        if not re.search(r'[0-9]', v):
-            raise ValueError('A senha deve conter pelo menos um número')
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-            raise ValueError('A senha deve conter pelo menos um caractere especial')
-        return v
+        return _validar_regras_senha(v)
 
-    @validator('confirmar_password')
-    def passwords_match(cls, v, values):
-        if 'password' in values and v != values['password']:
+    @field_validator('confirmar_password')
+    @classmethod
+    def passwords_match(cls, v, info):
+        if 'password' in info.data and v != info.data['password']:
             raise ValueError('As senhas não coincidem')
         return v
 
 class Usuario(UsuarioBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     personagens: List[Personagem] = []
 
-    class Config:
-        from_attributes = True
-
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    exp: Optional[int] = None
 
 class LoginRequest(BaseModel):
     username: str
     password: str
+
+# Corpos das rotas em lote. As rotas validam os bytes recebidos com
+# validate_json: o parse e a validação da lista inteira são uma única chamada
+# ao pydantic-core, sem json.loads nem laço em Python por elemento
+LIMITE_LOTE = 500
+
+ADAPTADOR_ITENS_CRIAR = TypeAdapter(Annotated[List[ItemCriar], Field(min_length=1, max_length=LIMITE_LOTE)])
+ADAPTADOR_ITENS_ATUALIZAR = TypeAdapter(
+    Annotated[List[ItemAtualizarLote], Field(min_length=1, max_length=LIMITE_LOTE)]
+)
@@ -1,7 +1,11 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from .config import configuracoes
 from .schemas import TokenData
 
 # Configurações de segurança
@@ -9,6 +13,10 @@ CHAVE_SECRETA = "your-secret-key-keep-it-secret"  # Em produção, use variável
 ALGORITMO = "HS256"
 TEMPO_EXPIRACAO_TOKEN_MINUTOS = 30
 
+# Pool de processos para o bcrypt (não bloqueia o event loop)
+PROCESSOS_HASH = configuracoes.processos_hash
+LIMITE_FILA_HASH = configuracoes.limite_fila_hash or PROCESSOS_HASH * 8
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verificar_password(password_texto: str, password_hash: str) -> bool:
@@ -17,6 +25,60 @@ def verificar_password(password_texto: str, password_hash: str) -> bool:
 def gerar_hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
+class FilaHashCheiaError(Exception):
+    """Muitas operações de hash pendentes; a requisição deve ser recusada."""
+
+_executor_hash: Optional[ProcessPoolExecutor] = None
+_hash_pendentes = 0
+
+def dividir_executor_hash(workers: int) -> None:
+    """Reparte os processos e a fila de hash entre os ``workers`` do servidor.
+
+    Chamado no processo principal antes do fork: cada worker cria o próprio
+    pool no lifespan, e o total no host continua limitado aos núcleos.
+    """
+    global PROCESSOS_HASH, LIMITE_FILA_HASH
+    PROCESSOS_HASH = max(1, configuracoes.processos_hash // workers)
+    if configuracoes.limite_fila_hash:
+        LIMITE_FILA_HASH = max(1, configuracoes.limite_fila_hash // workers)
+    else:
+        LIMITE_FILA_HASH = PROCESSOS_HASH * 8
+
+def iniciar_executor_hash() -> ProcessPoolExecutor:
+    """Cria o pool de hash; a aplicação chama no lifespan, antes da primeira requisição."""
+    global _executor_hash
+    if _executor_hash is None:
+        # spawn em vez do fork padrão no Linux: o processo do servidor já tem
+        # o event loop e as threads do aiosqlite, e um fork de processo com
+        # threads pode deixar o filho travado num lock herdado
+        _executor_hash = ProcessPoolExecutor(
+            max_workers=PROCESSOS_HASH, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor_hash
+
+async def _executar_hash(funcao, *args):
+    global _hash_pendentes
+    if _hash_pendentes >= LIMITE_FILA_HASH:
+        raise FilaHashCheiaError()
+    _hash_pendentes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(iniciar_executor_hash(), funcao, *args)
+    finally:
+        _hash_pendentes -= 1
+
+async def verificar_password_async(password_texto: str, password_hash: str) -> bool:
+    return await _executar_hash(verificar_password, password_texto, password_hash)
+
+async def gerar_hash_password_async(password: str) -> str:
+    return await _executar_hash(gerar_hash_password, password)
+
+def encerrar_executor_hash() -> None:
+    global _executor_hash
+    if _executor_hash is not None:
+        _executor_hash.shutdown(wait=True)
+        _executor_hash = None
+
 def criar_token_acesso(dados: dict, tempo_expiracao: Optional[timedelta] = None) -> str:
     dados_codificar = dados.copy()
     if tempo_expiracao:
@@ -33,7 +95,7 @@ def verificar_token(token: str, erro_credenciais) -> TokenData:
         username: str = payload.get("sub")
         if username is None:
             raise erro_credenciais
-        dados_token = TokenData(username=username)
+        dados_token = TokenData(username=username, exp=payload.get("exp"))
         return dados_token
     except JWTError:
         raise erro_credenciais
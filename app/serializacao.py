@@ -0,0 +1,156 @@
+import json
+from typing import List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import models, schemas
+from .config import configuracoes
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da biblioteca padrão
+    orjson = None
+
+# Caminho rápido de serialização: monta dicts direto das linhas da consulta,
+# na mesma ordem de campos dos schemas, e codifica sem passar pela validação
+# do response_model. Ativado com RPG_SERIALIZACAO_RAPIDA=true; com
+# RPG_SERIALIZACAO_VERIFICAR=true cada resposta é comparada com a do
+# response_model sobre os mesmos registros carregados pelo ORM (desenvolvimento).
+
+# Mesma ordem de campos de schemas.PersonagemResumo e schemas.Item
+COLUNAS_PERSONAGEM = (
+    models.Personagem.nome,
+    models.Personagem.classe,
+    models.Personagem.nivel,
+    models.Personagem.id,
+    models.Personagem.usuario_id,
+)
+COLUNAS_ITEM = (
+    models.Item.nome,
+    models.Item.descricao,
+    models.Item.tipo,
+    models.Item.id,
+    models.Item.personagem_id,
+)
+
+ADAPTADOR_PERSONAGEM = TypeAdapter(schemas.Personagem)
+ADAPTADOR_PERSONAGENS = TypeAdapter(List[schemas.Personagem])
+ADAPTADOR_PERSONAGENS_RESUMO = TypeAdapter(List[schemas.PersonagemResumo])
+ADAPTADOR_ITENS = TypeAdapter(List[schemas.Item])
+ADAPTADOR_USUARIO = TypeAdapter(schemas.Usuario)
+
+def codificar_json(dados) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(dados)
+    # Mesmo formato compacto do JSONResponse do Starlette
+    return json.dumps(dados, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class RespostaJSONRapida(JSONResponse):
+    def render(self, content) -> bytes:
+        return codificar_json(content)
+
+async def _personagens_orm(db: AsyncSession, ids: List[int]) -> List[models.Personagem]:
+    # Mesma carga das rotas sem o caminho rápido
+    return list((await db.scalars(
+        select(models.Personagem)
+        .where(models.Personagem.id.in_(ids))
+        .order_by(models.Personagem.id)
+        .options(selectinload(models.Personagem.itens))
+    )).all())
+
+async def _objetos_orm(db: AsyncSession, adaptador: TypeAdapter, dados):
+    """Carrega pelo ORM o que o response_model receberia para os mesmos ids."""
+    if adaptador is ADAPTADOR_PERSONAGEM:
+        encontrados = await _personagens_orm(db, [dados["id"]])
+        return encontrados[0] if encontrados else None
+    if adaptador is ADAPTADOR_USUARIO:
+        usuario = (await db.execute(
+            select(models.Usuario.id, models.Usuario.username, models.Usuario.email).where(
+                models.Usuario.id == dados["id"]
+            )
+        )).first()
+        personagens = await _personagens_orm(db, [p["id"] for p in dados["personagens"]])
+        return schemas.Usuario(
+            id=usuario.id,
+            username=usuario.username,
+            email=usuario.email,
+            personagens=[schemas.Personagem.model_validate(p) for p in personagens],
+        )
+    if adaptador is ADAPTADOR_ITENS:
+        # A ordem do inventário vem da mesma consulta nos dois caminhos
+        ids = [item["id"] for item in dados]
+        por_id = {item.id: item for item in (await db.scalars(
+            select(models.Item).where(models.Item.id.in_(ids))
+        )).all()}
+        return [por_id.get(item_id) for item_id in ids]
+    return await _personagens_orm(db, [p["id"] for p in dados])
+
+async def verificar_formato(db: AsyncSession, adaptador: TypeAdapter, dados) -> None:
+    # Compara com o que o response_model produziria a partir dos objetos do ORM
+    objetos = await _objetos_orm(db, adaptador, dados)
+    esperado = adaptador.dump_python(adaptador.validate_python(objetos, from_attributes=True), mode="json")
+    if codificar_json(esperado) != codificar_json(dados):
+        raise ValueError("Resposta do caminho rápido difere do schema")
+
+async def resposta(db: AsyncSession, dados, adaptador: Optional[TypeAdapter] = None, **kwargs) -> RespostaJSONRapida:
+    if configuracoes.serializacao_verificar and adaptador is not None:
+        await verificar_formato(db, adaptador, dados)
+    return RespostaJSONRapida(content=dados, **kwargs)
+
+async def codificar(db: AsyncSession, dados, adaptador: TypeAdapter) -> bytes:
+    """Codifica ``dados`` como o response_model faria, para guardar os bytes em cache."""
+    if not configuracoes.serializacao_rapida:
+        dados = adaptador.dump_python(adaptador.validate_python(dados), mode="json")
+    elif configuracoes.serializacao_verificar:
+        await verificar_formato(db, adaptador, dados)
+    return codificar_json(dados)
+
+async def linhas_como_dicts(db: AsyncSession, consulta) -> List[dict]:
+    resultado = await db.execute(consulta)
+    return [dict(linha) for linha in resultado.mappings()]
+
+async def anexar_itens(db: AsyncSession, personagens: List[dict]) -> None:
+    # Uma única consulta para os itens de todos os personagens (como o selectinload)
+    itens_por_personagem = {}
+    for personagem in personagens:
+        personagem["itens"] = itens_por_personagem[personagem["id"]] = []
+    if not itens_por_personagem:
+        return
+    itens = await linhas_como_dicts(
+        db,
+        select(*COLUNAS_ITEM)
+        .where(models.Item.personagem_id.in_(itens_por_personagem))
+        .order_by(models.Item.personagem_id, models.Item.id)
+    )
+    for item in itens:
+        itens_por_personagem[item["personagem_id"]].append(item)
+
+async def pagina_personagens(
+    db: AsyncSession, usuario_id: int, limit: int, after: Optional[int], incluir_itens: bool
+) -> List[dict]:
+    consulta = (
+        select(*COLUNAS_PERSONAGEM)
+        .where(models.Personagem.usuario_id == usuario_id)
+        .order_by(models.Personagem.id)
+        .limit(limit)
+    )
+    if after is not None:
+        consulta = consulta.where(models.Personagem.id > after)
+    personagens = await linhas_como_dicts(db, consulta)
+    if incluir_itens:
+        await anexar_itens(db, personagens)
+    return personagens
+
+async def personagem(db: AsyncSession, personagem_id: int, usuario_id: int) -> Optional[dict]:
+    encontrados = await linhas_como_dicts(db, select(*COLUNAS_PERSONAGEM).where(
+        models.Personagem.id == personagem_id,
+        models.Personagem.usuario_id == usuario_id
+    ))
+    if not encontrados:
+        return None
+    await anexar_itens(db, encontrados)
+    return encontrados[0]
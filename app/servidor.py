@@ -0,0 +1,207 @@
+import argparse
+import bisect
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from . import migracoes, security
+from .config import configuracoes
+from .database import async_engine, engine
+
+# Servidor de produção: python -m app.servidor --workers 4. Migra e importa a
+# aplicação uma vez, abre o socket e cria os workers com fork
+
+logger = logging.getLogger("app.servidor")
+
+INTERVALO_SUPERVISAO_S = 0.5
+# Worker que sai antes deste tempo conta como falha na inicialização
+TEMPO_MINIMO_VIDA_S = 10
+ESPERA_REINICIO_MAXIMA_S = 30
+MAXIMO_FALHAS_SEGUIDAS = 5
+# Mesmo código de saída do uvicorn.run quando a inicialização falha
+CODIGO_FALHA_INICIALIZACAO = 3
+
+def workers_seguros(workers: int) -> int:
+    """Ajusta o número de workers às limitações do banco configurado."""
+    if not configuracoes.sqlite:
+        return workers
+    if ":memory:" in configuracoes.database_url and workers > 1:
+        logger.warning("SQLite em memória não é compartilhado entre processos; usando 1 worker")
+        return 1
+    if workers > 1 and str(configuracoes.pragmas_sqlite().get("journal_mode", "")).upper() != "WAL":
+        # Sem WAL, leitores de um worker bloqueiam as escritas dos outros
+        logger.warning(
+            "Vários workers com SQLite sem journal WAL: use RPG_SQLITE_PERFIL=producao "
+            "e RPG_SQLITE_JOURNAL_MODE=WAL para evitar erros 'database is locked'"
+        )
+    return workers
+
+def abrir_socket(host: str, porta: int, backlog: int = 2048) -> socket.socket:
+    familia = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(familia, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, porta))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _config_uvicorn(app, args) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level=args.log_level,
+        access_log=not args.sem_access_log,
+        timeout_graceful_shutdown=args.tempo_encerramento,
+    )
+
+def _servir(app, sock: socket.socket, args) -> int:
+    servidor = uvicorn.Server(_config_uvicorn(app, args))
+    servidor.run(sockets=[sock])
+    # Falha no startup do lifespan: o uvicorn só encerra, sem exceção
+    return 0 if servidor.started else CODIGO_FALHA_INICIALIZACAO
+
+def _executar_worker(app, sock: socket.socket, args) -> int:
+    # O processo principal instala os próprios handlers; o uvicorn instala os dele
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Conexões herdadas do processo principal não podem ser usadas pelo filho
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    return _servir(app, sock, args)
+
+def _criar_worker(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        codigo = 0
+        try:
+            codigo = _executar_worker(app, sock, args)
+        except BaseException:
+            logger.exception("Worker %d terminou com erro", os.getpid())
+            codigo = 1
+        finally:
+            os._exit(codigo)
+    logger.info("Worker %d iniciado", pid)
+    return pid
+
+def _encerrar_workers(filhos: Dict[int, float], tempo_encerramento: int) -> None:
+    for pid in filhos:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    # Margem além do timeout do uvicorn para o shutdown do lifespan
+    prazo = time.monotonic() + tempo_encerramento + 5
+    while filhos and time.monotonic() < prazo:
+        for pid in list(filhos):
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                del filhos[pid]
+        time.sleep(0.1)
+    for pid in filhos:
+        logger.warning("Worker %d não encerrou a tempo; enviando SIGKILL", pid)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+def _descrever_status(status: int) -> str:
+    codigo = os.waitstatus_to_exitcode(status)
+    if codigo < 0:
+        return f"sinal {signal.Signals(-codigo).name}"
+    return f"código {codigo}"
+
+def espera_reinicio(falhas_seguidas: int) -> float:
+    """Espera antes de recriar um worker, dobrando a cada falha seguida."""
+    if not falhas_seguidas:
+        return 0.0
+    return min(ESPERA_REINICIO_MAXIMA_S, INTERVALO_SUPERVISAO_S * 2 ** falhas_seguidas)
+
+# Substitui os workers que morrem até receber SIGTERM ou SIGINT, quando
+# encerra todos de forma graciosa
+def supervisionar(app, sock: socket.socket, args) -> int:
+    filhos = {_criar_worker(app, sock, args): time.monotonic() for _ in range(args.workers)}
+    # Instantes em que um worker substituto deve ser criado
+    reinicios: List[float] = []
+    falhas_seguidas = 0
+    codigo_saida = 0
+    encerrar = False
+
+    def _ao_receber_sinal(sinal, frame):
+        nonlocal encerrar
+        encerrar = True
+
+    signal.signal(signal.SIGTERM, _ao_receber_sinal)
+    signal.signal(signal.SIGINT, _ao_receber_sinal)
+
+    while not encerrar:
+        while reinicios and reinicios[0] <= time.monotonic():
+            reinicios.pop(0)
+            filhos[_criar_worker(app, sock, args)] = time.monotonic()
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            # Todos os workers morreram e os substitutos ainda estão esperando
+            pid = 0
+        if not pid:
+            time.sleep(INTERVALO_SUPERVISAO_S)
+            continue
+        if pid not in filhos:
+            continue
+        inicio = filhos.pop(pid)
+        if encerrar:
+            break
+        if time.monotonic() - inicio < TEMPO_MINIMO_VIDA_S:
+            falhas_seguidas += 1
+        else:
+            falhas_seguidas = 0
+        if falhas_seguidas >= MAXIMO_FALHAS_SEGUIDAS:
+            logger.error(
+                "Worker %d saiu com %s logo após iniciar (%d falhas seguidas); encerrando o servidor",
+                pid, _descrever_status(status), falhas_seguidas,
+            )
+            codigo_saida = 1
+            break
+        espera = espera_reinicio(falhas_seguidas)
+        logger.warning("Worker %d saiu com %s; iniciando outro em %.1f s", pid, _descrever_status(status), espera)
+        bisect.insort(reinicios, time.monotonic() + espera)
+
+    logger.info("Encerrando %d workers", len(filhos))
+    _encerrar_workers(filhos, args.tempo_encerramento)
+    return codigo_saida
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de produção da API")
+    parser.add_argument("--host", default=configuracoes.servidor_host)
+    parser.add_argument("--porta", type=int, default=configuracoes.servidor_porta)
+    parser.add_argument("--workers", type=int, default=configuracoes.servidor_workers)
+    parser.add_argument(
+        "--tempo-encerramento", type=int, default=configuracoes.servidor_tempo_encerramento_s,
+        help="segundos para concluir as requisições em andamento no encerramento",
+    )
+    parser.add_argument("--sem-migrar", action="store_true", help="não migra o esquema antes de subir")
+    parser.add_argument("--sem-access-log", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(levelname)s %(message)s")
+
+    args.workers = workers_seguros(max(1, args.workers))
+    if not args.sem_migrar:
+        # DDL uma única vez, antes dos workers existirem
+        migracoes.migrar(engine)
+    engine.dispose()
+
+    from .main import criar_app
+    app = criar_app()
+    sock = abrir_socket(args.host, args.porta)
+    logger.info("Escutando em http://%s:%d com %d worker(s)", args.host, args.porta, args.workers)
+
+    if args.workers == 1 or not hasattr(os, "fork"):
+        raise SystemExit(_servir(app, sock, args))
+    # Antes do fork: cada worker herda a sua parte do pool de hash
+    security.dividir_executor_hash(args.workers)
+    raise SystemExit(supervisionar(app, sock, args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import configuracoes
+from .serializacao import COLUNAS_ITEM, COLUNAS_PERSONAGEM, linhas_como_dicts
+
+# Cada escrita registra uma linha em alteracoes na mesma transação; GET /sync
+# devolve o que mudou depois do cursor. Compactação: python -m app.sincronizacao
+
+PERSONAGEM = "personagem"
+ITEM = "item"
+
+CRIAR = "criar"
+ATUALIZAR = "atualizar"
+REMOVER = "remover"
+
+# O cursor é o id da alteração, o que só é seguro com um único escritor: no
+# PostgreSQL um id menor pode fazer commit depois de um maior e se perder
+def disponivel(dialeto: str) -> bool:
+    return dialeto == "sqlite"
+
+async def registrar(
+    db: AsyncSession, usuario_id: int, entidade: str, operacao: str, ids: Iterable[Tuple[int, int]]
+) -> None:
+    """Registra ``operacao`` para cada par (entidade_id, personagem_id), sem fazer commit."""
+    linhas = [
+        {
+            "usuario_id": usuario_id,
+            "entidade": entidade,
+            "entidade_id": entidade_id,
+            "personagem_id": personagem_id,
+            "operacao": operacao,
+        }
+        for entidade_id, personagem_id in ids
+    ]
+    if linhas:
+        await db.execute(insert(models.Alteracao), linhas)
+
+async def compactado_ate(db: AsyncSession) -> int:
+    valor = await db.scalar(select(models.EstadoSincronizacao.compactado_ate))
+    return valor or 0
+
+async def cursor_atual(db: AsyncSession) -> int:
+    maior = await db.scalar(select(func.max(models.Alteracao.id)))
+    return max(maior or 0, await compactado_ate(db))
+
+async def alteracoes_desde(db: AsyncSession, usuario_id: int, desde: int, limit: int) -> dict:
+    # Só a alteração mais recente de cada entidade importa. Ordenar as
+    # entidades pelo id dessa alteração mantém a paginação correta: uma
+    # entidade que mudar de novo aparece numa página posterior.
+    ultimas = (
+        select(func.max(models.Alteracao.id).label("id"))
+        .where(models.Alteracao.usuario_id == usuario_id, models.Alteracao.id > desde)
+        .group_by(models.Alteracao.entidade, models.Alteracao.entidade_id)
+        .order_by(func.max(models.Alteracao.id))
+        .limit(limit + 1)
+        .subquery()
+    )
+    linhas = (await db.execute(
+        select(models.Alteracao.id, models.Alteracao.entidade, models.Alteracao.entidade_id, models.Alteracao.operacao)
+        .join(ultimas, models.Alteracao.id == ultimas.c.id)
+        .order_by(models.Alteracao.id)
+    )).all()
+    mais = len(linhas) > limit
+    linhas = linhas[:limit]
+
+    vivos = {PERSONAGEM: [], ITEM: []}
+    removidos = {PERSONAGEM: [], ITEM: []}
+    for linha in linhas:
+        destino = removidos if linha.operacao == REMOVER else vivos
+        destino[linha.entidade].append(linha.entidade_id)
+
+    personagens: List[dict] = []
+    if vivos[PERSONAGEM]:
+        personagens = await linhas_como_dicts(db, select(*COLUNAS_PERSONAGEM).where(
+            models.Personagem.id.in_(vivos[PERSONAGEM]),
+            models.Personagem.usuario_id == usuario_id
+        ).order_by(models.Personagem.id))
+    itens: List[dict] = []
+    if vivos[ITEM]:
+        itens = await linhas_como_dicts(db, select(*COLUNAS_ITEM).join(models.Personagem).where(
+            models.Item.id.in_(vivos[ITEM]),
+            models.Personagem.usuario_id == usuario_id
+        ).order_by(models.Item.id))
+    # Entidades registradas mas que já não existem contam como removidas
+    encontrados = {p["id"] for p in personagens}
+    removidos[PERSONAGEM] += [i for i in vivos[PERSONAGEM] if i not in encontrados]
+    encontrados = {i["id"] for i in itens}
+    removidos[ITEM] += [i for i in vivos[ITEM] if i not in encontrados]
+
+    return {
+        "cursor": linhas[-1].id if linhas else desde,
+        "mais": mais,
+        "personagens": personagens,
+        "itens": itens,
+        "personagens_removidos": sorted(removidos[PERSONAGEM]),
+        "itens_removidos": sorted(removidos[ITEM]),
+    }
+
+COLUNAS_REGISTRO = ["usuario_id", "entidade", "entidade_id", "personagem_id", "operacao"]
+
+def _registrar_itens_criados(filtro):
+    # Uma linha "criar" por item dos personagens do filtro, num INSERT ... SELECT
+    return insert(models.Alteracao).from_select(
+        COLUNAS_REGISTRO,
+        select(
+            models.Personagem.usuario_id, literal(ITEM), models.Item.id,
+            models.Item.personagem_id, literal(CRIAR)
+        )
+        .join(models.Personagem, models.Item.personagem_id == models.Personagem.id)
+        .where(filtro)
+        .order_by(models.Item.id)
+    )
+
+async def registrar_itens_criados(db: AsyncSession, personagem_ids: Sequence[int]) -> None:
+    """Registra como criados todos os itens dos personagens, sem fazer commit."""
+    if personagem_ids:
+        await db.execute(_registrar_itens_criados(models.Personagem.id.in_(personagem_ids)))
+
+def preencher(conexao: Connection, usuario_ids: Optional[Sequence[int]] = None) -> None:
+    """Registra como criados os personagens e itens que ainda não passaram pelo registro.
+
+    Sem ``usuario_ids``, os de todos os usuários (dados anteriores ao registro);
+    com, só os desses usuários (ex.: recém-criados por inserção direta).
+    """
+    if usuario_ids is not None:
+        filtro = models.Personagem.usuario_id.in_(usuario_ids)
+    else:
+        filtro = models.Personagem.usuario_id.is_not(None)
+    conexao.execute(insert(models.Alteracao).from_select(
+        COLUNAS_REGISTRO,
+        select(
+            models.Personagem.usuario_id, literal(PERSONAGEM), models.Personagem.id,
+            models.Personagem.id, literal(CRIAR)
+        )
+        .where(filtro)
+        .order_by(models.Personagem.id)
+    ))
+    conexao.execute(_registrar_itens_criados(filtro))
+
+def compactar(conexao: Connection, retencao: timedelta) -> dict:
+    # Só a alteração mais recente de cada entidade importa. O usuário entra na
+    # chave porque o SQLite reaproveita ids de personagens e itens removidos
+    ultimas = select(func.max(models.Alteracao.id)).group_by(
+        models.Alteracao.usuario_id, models.Alteracao.entidade, models.Alteracao.entidade_id
+    )
+    superadas = conexao.execute(
+        delete(models.Alteracao).where(models.Alteracao.id.not_in(ultimas))
+    ).rowcount
+
+    # Cursores anteriores às linhas apagadas por idade recebem 410
+    antigas = 0
+    limite = conexao.scalar(
+        select(func.max(models.Alteracao.id)).where(models.Alteracao.criado_em < datetime.utcnow() - retencao)
+    )
+    if limite is not None:
+        antigas = conexao.execute(delete(models.Alteracao).where(models.Alteracao.id <= limite)).rowcount
+        atual = conexao.scalar(select(models.EstadoSincronizacao.compactado_ate))
+        if atual is None:
+            conexao.execute(insert(models.EstadoSincronizacao).values(id=1, compactado_ate=limite))
+        elif limite > atual:
+            conexao.execute(update(models.EstadoSincronizacao).values(compactado_ate=limite))
+    return {"superadas": superadas, "antigas": antigas, "compactado_ate": limite}
+
+if __name__ == "__main__":
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description="Compacta o registro de alterações")
+    parser.add_argument("--dias", type=float, default=configuracoes.sincronizacao_retencao_dias,
+                        help="retenção das alterações, em dias")
+    args = parser.parse_args()
+    with engine.begin() as conexao:
+        resultado = compactar(conexao, timedelta(days=args.dias))
+    print(f"Alterações compactadas: {resultado}")
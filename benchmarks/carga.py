@@ -0,0 +1,287 @@
+"""Benchmark em processo de todas as rotas de app.main.
+
+Uso:
+    python -m benchmarks.gerar_dados --usuarios 20 --personagens 20 --itens 30
+    python -m benchmarks.carga --requisicoes 500 --concorrencia 16 --saida resultado.json
+
+As requisições passam pela aplicação ASGI diretamente (httpx.ASGITransport),
+sem rede. O relatório JSON traz, por rota, vazão e latências p50/p95/p99 para
+comparar commits entre si.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+
+from app import security
+from app.config import configuracoes
+from app.main import app
+from benchmarks.gerar_dados import PREFIXO_USUARIO, SENHA_PADRAO
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+async def medir(total: int, concorrencia: int, fazer: Callable[[int], Awaitable[httpx.Response]]) -> dict:
+    latencias: List[float] = []
+    erros = 0
+    proximo = 0
+
+    async def trabalhador():
+        nonlocal proximo, erros
+        while proximo < total:
+            i = proximo
+            proximo += 1
+            inicio = time.perf_counter()
+            try:
+                resposta = await fazer(i)
+                sucesso = resposta.status_code < 400
+            except Exception:
+                sucesso = False
+            latencias.append(time.perf_counter() - inicio)
+            if not sucesso:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(min(concorrencia, total))))
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": total,
+        "erros": erros,
+        "segundos": round(duracao, 4),
+        "vazao_rps": round(total / duracao, 2) if duracao else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+    }
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def executar(
+    requisicoes: int,
+    requisicoes_caras: int,
+    concorrencia: int,
+    usuarios_ativos: int,
+    prefixo: str,
+    rotas: Optional[List[str]] = None,
+) -> dict:
+    execucao = uuid.uuid4().hex[:8]
+    # O benchmark mede a vazão das rotas, não os orçamentos do limitador
+    configuracoes.limitador_ativo = False
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        # Sessões dos usuários gerados por benchmarks.gerar_dados
+        sessoes = []
+        for i in range(usuarios_ativos):
+            resposta = await cliente.post("/login", data={"username": f"{prefixo}_{i}", "password": SENHA_PADRAO})
+            if resposta.status_code != 200:
+                break
+            cabecalhos = {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+            perfil = (await cliente.get("/meu-perfil?incluir_itens=false", headers=cabecalhos)).json()
+            if perfil["personagens"]:
+                sessoes.append({
+                    "cabecalhos": cabecalhos,
+                    "perfil": {"username": perfil["username"], "email": perfil["email"]},
+                    "personagens": [p["id"] for p in perfil["personagens"]],
+                })
+        if not sessoes:
+            raise SystemExit(
+                f"Nenhum usuário '{prefixo}_N' com personagens encontrado; rode benchmarks.gerar_dados antes"
+            )
+
+        def sessao(i):
+            return sessoes[i % len(sessoes)]
+
+        def personagem(i):
+            s = sessao(i)
+            return s["cabecalhos"], s["personagens"][(i // len(sessoes)) % len(s["personagens"])]
+
+        # Itens criados no cenário de POST são reaproveitados por PUT e DELETE
+        itens_criados = []
+
+        async def criar_item(i):
+            cabecalhos, personagem_id = personagem(i)
+            resposta = await cliente.post(
+                f"/personagens/{personagem_id}/inventario",
+                json={"nome": f"Bench {i}", "descricao": "Item de benchmark", "tipo": "arma"},
+                headers=cabecalhos,
+            )
+            if resposta.status_code == 200:
+                itens_criados.append((cabecalhos, personagem_id, resposta.json()["id"]))
+            return resposta
+
+        async def atualizar_item(i):
+            cabecalhos, personagem_id, item_id = itens_criados[i % len(itens_criados)]
+            return await cliente.put(
+                f"/personagens/{personagem_id}/inventario/{item_id}",
+                json={"nome": f"Bench {i}", "descricao": "Item atualizado", "tipo": "armadura"},
+                headers=cabecalhos,
+            )
+
+        async def deletar_item(i):
+            cabecalhos, personagem_id, item_id = itens_criados[i]
+            return await cliente.delete(f"/personagens/{personagem_id}/inventario/{item_id}", headers=cabecalhos)
+
+        # Lotes criados no POST em lote são reaproveitados pelo PUT e DELETE em lote
+        lotes_criados = []
+
+        async def adicionar_lote(i):
+            cabecalhos, personagem_id = personagem(i)
+            resposta = await cliente.post(
+                f"/personagens/{personagem_id}/inventario/lote",
+                json=[{"nome": f"Lote {i}-{j}", "descricao": "Item de benchmark", "tipo": "poção"} for j in range(20)],
+                headers=cabecalhos,
+            )
+            if resposta.status_code == 200:
+                lotes_criados.append((cabecalhos, personagem_id, [r["id"] for r in resposta.json()]))
+            return resposta
+
+        async def atualizar_lote(i):
+            cabecalhos, personagem_id, ids = lotes_criados[i % len(lotes_criados)]
+            return await cliente.put(
+                f"/personagens/{personagem_id}/inventario/lote",
+                json=[{"id": item_id, "nome": f"Lote {i}", "descricao": "Item atualizado", "tipo": "anel"} for item_id in ids],
+                headers=cabecalhos,
+            )
+
+        async def deletar_lote(i):
+            cabecalhos, personagem_id, ids = lotes_criados[i]
+            return await cliente.request(
+                "DELETE", f"/personagens/{personagem_id}/inventario/lote", json=ids, headers=cabecalhos
+            )
+
+        def atualizar_perfil(i):
+            # Mesmos dados e sem senha: mede a rota sem o bcrypt nem alterar os usuários
+            s = sessao(i)
+            return cliente.put("/meu-perfil", json=s["perfil"], headers=s["cabecalhos"])
+
+        def importar_perfil(i):
+            corpo = "".join(
+                json.dumps({
+                    "nome": f"Import {execucao} {i}-{j}",
+                    "classe": "Bardo",
+                    "nivel": 1,
+                    "itens": [{"nome": f"Item {k}", "descricao": "Item importado", "tipo": "anel"} for k in range(3)],
+                }) + "\n"
+                for j in range(20)
+            )
+            return cliente.post("/meu-perfil/import", content=corpo.encode("utf-8"), headers=sessao(i)["cabecalhos"])
+
+        # (nome, requisições, função, recursos criados por um cenário anterior ou None)
+        cenarios = [
+            ("GET /", requisicoes, lambda i: cliente.get("/"), None),
+            ("GET /exemplos", requisicoes, lambda i: cliente.get("/exemplos"), None),
+            ("GET /metrics", requisicoes, lambda i: cliente.get("/metrics"), None),
+            ("POST /login", requisicoes_caras, lambda i: cliente.post(
+                "/login", data={"username": f"{prefixo}_{i % len(sessoes)}", "password": SENHA_PADRAO}
+            ), None),
+            ("POST /register", requisicoes_caras, lambda i: cliente.post("/register", json={
+                "username": f"reg_{execucao}_{i}",
+                "email": f"reg_{execucao}_{i}@exemplo.com",
+                "password": SENHA_PADRAO,
+                "confirmar_password": SENHA_PADRAO,
+            }), None),
+            ("GET /meu-perfil", requisicoes, lambda i: cliente.get("/meu-perfil", headers=sessao(i)["cabecalhos"]), None),
+            ("PUT /meu-perfil", requisicoes, atualizar_perfil, None),
+            ("GET /meu-perfil/export", requisicoes_caras, lambda i: cliente.get(
+                "/meu-perfil/export", headers=sessao(i)["cabecalhos"]
+            ), None),
+            ("POST /meu-perfil/import", requisicoes_caras, importar_perfil, None),
+            ("GET /estatisticas", requisicoes, lambda i: cliente.get("/estatisticas", headers=sessao(i)["cabecalhos"]), None),
+            ("GET /personagens", requisicoes, lambda i: cliente.get("/personagens", headers=sessao(i)["cabecalhos"]), None),
+            ("GET /sync", requisicoes, lambda i: cliente.get(
+                "/sync?desde=0&limit=100", headers=sessao(i)["cabecalhos"]
+            ), None),
+            ("POST /personagens", requisicoes, lambda i: cliente.post(
+                "/personagens",
+                json={"nome": f"Bench {execucao} {i}", "classe": "Mago", "nivel": 1},
+                headers=sessao(i)["cabecalhos"],
+            ), None),
+            ("POST /personagens/gerar", requisicoes_caras, lambda i: cliente.post(
+                "/personagens/gerar", json={"quantidade": 20, "semente": i}, headers=sessao(i)["cabecalhos"]
+            ), None),
+            ("GET /personagens/{id}", requisicoes, lambda i: cliente.get(
+                f"/personagens/{personagem(i)[1]}", headers=personagem(i)[0]
+            ), None),
+            ("GET /personagens/{id}/estatisticas", requisicoes, lambda i: cliente.get(
+                f"/personagens/{personagem(i)[1]}/estatisticas", headers=personagem(i)[0]
+            ), None),
+            ("GET /personagens/{id}/inventario", requisicoes, lambda i: cliente.get(
+                f"/personagens/{personagem(i)[1]}/inventario", headers=personagem(i)[0]
+            ), None),
+            ("GET /itens/busca", requisicoes, lambda i: cliente.get(
+                "/itens/busca?q=espada", headers=sessao(i)["cabecalhos"]
+            ), None),
+            ("POST /personagens/{id}/inventario", requisicoes, criar_item, None),
+            ("PUT /personagens/{id}/inventario/{item_id}", requisicoes, atualizar_item, itens_criados),
+            ("DELETE /personagens/{id}/inventario/{item_id}", requisicoes, deletar_item, itens_criados),
+            ("POST /personagens/{id}/inventario/lote", requisicoes, adicionar_lote, None),
+            ("PUT /personagens/{id}/inventario/lote", requisicoes, atualizar_lote, lotes_criados),
+            ("DELETE /personagens/{id}/inventario/lote", requisicoes, deletar_lote, lotes_criados),
+        ]
+
+        resultados = {}
+        for nome, total, fazer, recursos in cenarios:
+            if rotas and nome not in rotas:
+                continue
+            if recursos is not None:
+                # Depende do cenário que cria os recursos (pulado se ele não rodou)
+                if not recursos:
+                    continue
+                total = min(total, len(recursos))
+            resultados[nome] = await medir(total, concorrencia, fazer)
+
+    security.encerrar_executor_hash()
+    return {
+        "metadados": {
+            "commit": _commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database_url": configuracoes.database_url,
+            "serializacao_rapida": configuracoes.serializacao_rapida,
+            "concorrencia": concorrencia,
+            "usuarios_ativos": len(sessoes),
+        },
+        "rotas": resultados,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark em processo das rotas da API")
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por rota")
+    parser.add_argument("--requisicoes-caras", type=int, default=20,
+                        help="requisições para as rotas caras (bcrypt, exportação, importação e geração)")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--usuarios-ativos", type=int, default=10)
+    parser.add_argument("--prefixo", default=f"{PREFIXO_USUARIO}_42", help="prefixo dos usuários gerados")
+    parser.add_argument("--rota", action="append", dest="rotas", help="executa só a rota indicada (repetível)")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    relatorio = asyncio.run(executar(
+        args.requisicoes, args.requisicoes_caras, args.concorrencia, args.usuarios_ativos, args.prefixo, args.rotas
+    ))
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Popula o banco com dados sintéticos para testes de carga.
+
+Uso:
+    python -m benchmarks.gerar_dados --usuarios 100 --personagens 20 --itens 30 --semente 42
+
+O banco é o configurado em RPG_DATABASE_URL (padrão: sqlite:///./rpg_inventory.db).
+Todos os usuários gerados usam a senha SENHA_PADRAO.
+"""
+import argparse
+import json
+import random
+import time
+
+from sqlalchemy import insert, select
+
+from app import estatisticas, gerador, migracoes, models, security, sincronizacao
+from app.database import SessionLocal
+
+SENHA_PADRAO = "Senha@123"
+PREFIXO_USUARIO = "bench"
+TAMANHO_LOTE = 5000
+
+def _em_lotes(linhas, tamanho=TAMANHO_LOTE):
+    for inicio in range(0, len(linhas), tamanho):
+        yield linhas[inicio:inicio + tamanho]
+
+def gerar(usuarios: int, personagens: int, itens: int, semente: int = 42, prefixo: str = PREFIXO_USUARIO) -> dict:
+    rng = random.Random(semente)
+    migracoes.migrar()
+    inicio = time.perf_counter()
+    # Um único hash para todos: o bcrypt dominaria o tempo de geração
+    password_hash = security.gerar_hash_password(SENHA_PADRAO)
+
+    with SessionLocal() as db:
+        # executemany em lotes e uma consulta por lote para ler os ids pelas
+        # chaves naturais (username; usuário e nome do personagem)
+        usuario_ids = []
+        linhas_usuarios = [
+            {"username": f"{prefixo}_{semente}_{i}", "email": f"{prefixo}_{semente}_{i}@exemplo.com", "password_hash": password_hash}
+            for i in range(usuarios)
+        ]
+        for lote in _em_lotes(linhas_usuarios):
+            db.execute(insert(models.Usuario), lote)
+            ids_por_nome = dict(db.execute(
+                select(models.Usuario.username, models.Usuario.id).where(
+                    models.Usuario.username.in_([linha["username"] for linha in lote])
+                )
+            ).all())
+            usuario_ids += [ids_por_nome[linha["username"]] for linha in lote]
+
+        total_personagens = 0
+        total_itens = 0
+        lote_itens = []
+        for grupo in _em_lotes(usuario_ids, max(1, TAMANHO_LOTE // max(1, personagens))):
+            elencos = [
+                gerador.gerar_elenco(rng, personagens, itens_minimo=itens, itens_maximo=itens) for _ in grupo
+            ]
+            linhas_personagens = [
+                {**p, "usuario_id": usuario_id} for usuario_id, (elenco, _) in zip(grupo, elencos) for p in elenco
+            ]
+            if not linhas_personagens:
+                continue
+            db.execute(insert(models.Personagem), linhas_personagens)
+            total_personagens += len(linhas_personagens)
+            # Os nomes gerados são únicos dentro do elenco de cada usuário
+            personagem_ids = {
+                (usuario_id, nome): personagem_id
+                for personagem_id, usuario_id, nome in db.execute(
+                    select(models.Personagem.id, models.Personagem.usuario_id, models.Personagem.nome).where(
+                        models.Personagem.usuario_id.in_(grupo)
+                    )
+                )
+            }
+            for usuario_id, (elenco, itens_por_personagem) in zip(grupo, elencos):
+                for personagem, itens_personagem in zip(elenco, itens_por_personagem):
+                    personagem_id = personagem_ids[(usuario_id, personagem["nome"])]
+                    lote_itens += [{**item, "personagem_id": personagem_id} for item in itens_personagem]
+            if len(lote_itens) >= TAMANHO_LOTE:
+                db.execute(insert(models.Item), lote_itens)
+                total_itens += len(lote_itens)
+                lote_itens = []
+        if lote_itens:
+            db.execute(insert(models.Item), lote_itens)
+            total_itens += len(lote_itens)
+        # Inserções diretas não passam pelas rotas: recalcula os contadores e
+        # registra os dados gerados como criados, para que apareçam em GET /sync
+        estatisticas.reconstruir(db.connection())
+        for lote in _em_lotes(usuario_ids):
+            sincronizacao.preencher(db.connection(), lote)
+        db.commit()
+
+    return {
+        "usuarios": len(usuario_ids),
+        "personagens": total_personagens,
+        "itens": total_itens,
+        "semente": semente,
+        "prefixo": f"{prefixo}_{semente}",
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos de RPG para benchmarks")
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--personagens", type=int, default=10, help="personagens por usuário")
+    parser.add_argument("--itens", type=int, default=20, help="itens por personagem")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--prefixo", default=PREFIXO_USUARIO)
+    args = parser.parse_args()
+    print(json.dumps(gerar(args.usuarios, args.personagens, args.itens, args.semente, args.prefixo), ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
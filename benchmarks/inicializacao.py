@@ -0,0 +1,98 @@
+"""Mede o tempo de partida a frio da aplicação.
+
+Uso:
+    python -m benchmarks.inicializacao --repeticoes 5 --saida inicializacao.json
+
+Cada repetição roda num processo Python novo e mede: importação de app.main,
+criar_app() e a primeira resposta (GET /, sem rede). O relatório traz a
+mediana de cada etapa e os módulos com maior tempo próprio de importação
+(python -X importtime).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import List
+
+from benchmarks.carga import _commit_atual
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SCRIPT = """
+import asyncio, json, time
+import httpx
+inicio = time.perf_counter()
+import app.main
+importacao = time.perf_counter()
+aplicacao = app.main.criar_app()
+criacao = time.perf_counter()
+async def primeira():
+    transporte = httpx.ASGITransport(app=aplicacao)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        return (await cliente.get("/")).status_code
+status = asyncio.run(primeira())
+fim = time.perf_counter()
+print(json.dumps({
+    "importacao_ms": (importacao - inicio) * 1000,
+    "criar_app_ms": (criacao - importacao) * 1000,
+    "primeira_resposta_ms": (fim - criacao) * 1000,
+    "status": status,
+}))
+"""
+
+def medir_processo() -> dict:
+    saida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT], cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+def modulos_mais_caros(quantidade: int) -> List[dict]:
+    # Linhas do -X importtime: "import time: self [us] | cumulative | módulo"
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=RAIZ, capture_output=True, text=True
+    ).stderr
+    modulos = []
+    for linha in saida.splitlines():
+        partes = linha.split("|")
+        if len(partes) != 3 or not partes[0].strip().split(":")[-1].strip().isdigit():
+            continue
+        modulos.append({
+            "modulo": partes[2].strip(),
+            "proprio_ms": int(partes[0].split(":")[-1]) / 1000,
+            "acumulado_ms": int(partes[1]) / 1000,
+        })
+    return sorted(modulos, key=lambda m: m["proprio_ms"], reverse=True)[:quantidade]
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de partida a frio da aplicação")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modulos", type=int, default=15, help="quantos módulos listar no relatório")
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+
+    medicoes = [medir_processo() for _ in range(args.repeticoes)]
+    etapas = ("importacao_ms", "criar_app_ms", "primeira_resposta_ms")
+    relatorio = {
+        "metadados": {
+            "commit": _commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "repeticoes": args.repeticoes,
+        },
+        "mediana": {etapa: round(statistics.median(m[etapa] for m in medicoes), 2) for etapa in etapas},
+        "total_ms": round(statistics.median(sum(m[etapa] for etapa in etapas) for m in medicoes), 2),
+        "modulos": modulos_mais_caros(args.modulos),
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Micro-benchmark da validação dos corpos das rotas em lote.
+
+Uso:
+    python -m benchmarks.validacao --tamanho 500 --repeticoes 50 --saida validacao.json
+
+Para POST e PUT /personagens/{id}/inventario/lote, compara, sobre os mesmos
+bytes JSON, o que a rota fazia antes e o que faz agora:
+
+- antes: json.loads do corpo (Request.json), validação do parâmetro
+  Body(List[...]) pelo FastAPI (validate_python com from_attributes) e
+  .dict() de cada elemento na rota;
+- depois: _validar_corpo (validate_json do TypeAdapter sobre os bytes) e
+  dump_python da lista inteira.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from fastapi import Body
+from fastapi._compat import ModelField
+from pydantic import TypeAdapter
+
+from app import gerador, schemas
+from benchmarks.carga import _commit_atual
+
+def cronometrar(funcao: Callable[[], object], repeticoes: int) -> float:
+    """Mediana, em ms, de ``repeticoes`` execuções de ``funcao``."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def _campo_body(modelo) -> ModelField:
+    # O mesmo campo que o FastAPI montava para itens: List[modelo] = Body(..., min_length=1, max_length=500)
+    return ModelField(
+        name="itens",
+        field_info=Body(..., min_length=1, max_length=schemas.LIMITE_LOTE, annotation=List[modelo]),
+        mode="validation",
+    )
+
+def medir_lote(modelo, adaptador: TypeAdapter, dados: list, repeticoes: int) -> dict:
+    corpo = json.dumps(dados).encode("utf-8")
+    campo = _campo_body(modelo)
+
+    def antes():
+        valores, erros = campo.validate(json.loads(corpo), {}, loc=("body",))
+        assert erros is None
+        return [item.dict() for item in valores]
+
+    def depois():
+        return adaptador.dump_python(adaptador.validate_json(corpo))
+
+    assert antes() == depois()
+    with warnings.catch_warnings():
+        # .dict() é obsoleto no pydantic v2; o aviso não aparece em produção
+        warnings.simplefilter("ignore", DeprecationWarning)
+        antes_ms = cronometrar(antes, repeticoes)
+    depois_ms = cronometrar(depois, repeticoes)
+    return {
+        "elementos": len(dados),
+        "bytes": len(corpo),
+        "antes_ms": round(antes_ms, 3),
+        "depois_ms": round(depois_ms, 3),
+        "ganho": round(antes_ms / depois_ms, 2),
+    }
+
+def medir_usuarios(repeticoes: int, quantidade: int = 1000) -> dict:
+    dados = [
+        {
+            "username": f"usuario_{i}",
+            "email": f"usuario_{i}@exemplo.com",
+            "password": "Senha@123",
+            "confirmar_password": "Senha@123",
+        }
+        for i in range(quantidade)
+    ]
+    ms = cronometrar(lambda: [schemas.UsuarioCriar.model_validate(d) for d in dados], repeticoes)
+    return {"quantidade": quantidade, "total_ms": round(ms, 3), "por_usuario_us": round(ms * 1000 / quantidade, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da validação dos corpos em lote")
+    parser.add_argument("--tamanho", type=int, default=schemas.LIMITE_LOTE,
+                        help=f"elementos por lote (máximo aceito pelas rotas: {schemas.LIMITE_LOTE})")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="arquivo JSON de saída (padrão: stdout)")
+    args = parser.parse_args()
+    if not 1 <= args.tamanho <= schemas.LIMITE_LOTE:
+        parser.error(f"--tamanho deve estar entre 1 e {schemas.LIMITE_LOTE}")
+
+    rng = random.Random(args.semente)
+    _, itens_por_personagem = gerador.gerar_elenco(rng, args.tamanho, itens_minimo=1, itens_maximo=1)
+    itens = [itens[0] for itens in itens_por_personagem]
+    itens_atualizar = [{**item, "id": i} for i, item in enumerate(itens, start=1)]
+
+    relatorio = {
+        "metadados": {
+            "commit": _commit_atual(),
+            "data": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "tamanho": args.tamanho,
+            "repeticoes": args.repeticoes,
+        },
+        "POST /personagens/{id}/inventario/lote": medir_lote(
+            schemas.ItemCriar, schemas.ADAPTADOR_ITENS_CRIAR, itens, args.repeticoes
+        ),
+        "PUT /personagens/{id}/inventario/lote": medir_lote(
+            schemas.ItemAtualizarLote, schemas.ADAPTADOR_ITENS_ATUALIZAR, itens_atualizar, args.repeticoes
+        ),
+        "usuarios_criar": medir_usuarios(args.repeticoes),
+    }
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import limitador, main, models
+from app.cache import UsuarioAutenticado, cache_respostas
+from app.database import get_async_db
+
+@pytest.fixture
+def preparar_banco(tmp_path):
+    """Cria SQLites temporários: ``await preparar_banco()`` devolve (engine, fábrica de sessões).
+
+    O esquema padrão é o da aplicação; ``esquema`` recebe a conexão síncrona
+    para criar outro. Quem chama descarta a engine no mesmo event loop.
+    """
+    criados = []
+
+    async def preparar(esquema=models.Base.metadata.create_all, chaves_estrangeiras=False):
+        criados.append(tmp_path / f"banco{len(criados)}.db")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{criados[-1]}")
+        if chaves_estrangeiras:
+            @event.listens_for(engine.sync_engine, "connect")
+            def _ao_conectar(dbapi_connection, connection_record):
+                dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+        async with engine.begin() as conexao:
+            await conexao.run_sync(esquema)
+        return engine, async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    return preparar
+
+@pytest.fixture
+def criar_cliente():
+    """``criar_cliente(fabrica)`` devolve um TestClient da API sobre o banco da fábrica.
+
+    A autenticação é substituída: toda requisição chega como ``usuario``. O
+    cache de respostas e os baldes do limitador começam e terminam vazios.
+    """
+    def criar(fabrica, usuario=UsuarioAutenticado(id=1, username="aria", email="aria@exemplo.com")):
+        async def db_de_teste():
+            async with fabrica() as db:
+                yield db
+
+        main.app.dependency_overrides[get_async_db] = db_de_teste
+        main.app.dependency_overrides[main.obter_usuario_atual] = lambda: usuario
+        return TestClient(main.app)
+
+    def limpar():
+        cache_respostas.limpar()
+        for limitador_categoria in limitador.limitadores.values():
+            limitador_categoria.limpar()
+
+    limpar()
+    yield criar
+    main.app.dependency_overrides.clear()
+    limpar()
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.escrita import ColetorEscritas
+
+# Coletor de escritas agrupadas sobre um SQLite temporário. Um intervalo
+# longo garante que as operações enfileiradas juntas caiam no mesmo lote.
+
+INTERVALO_MS = 50
+
+def _criar_tabelas(conexao):
+    conexao.exec_driver_sql("CREATE TABLE pais (id INTEGER PRIMARY KEY)")
+    # A chave estrangeira adiada só é verificada no COMMIT do lote
+    conexao.exec_driver_sql(
+        "CREATE TABLE registros (id INTEGER PRIMARY KEY, valor TEXT NOT NULL UNIQUE,"
+        " pai_id INTEGER REFERENCES pais(id) DEFERRABLE INITIALLY DEFERRED)"
+    )
+
+async def _valores(fabrica):
+    async with fabrica() as db:
+        return set((await db.scalars(text("SELECT valor FROM registros"))).all())
+
+executadas = []
+
+async def inserir(db, valor, pai_id=None):
+    executadas.append(valor)
+    await db.execute(
+        text("INSERT INTO registros (valor, pai_id) VALUES (:valor, :pai_id)"),
+        {"valor": valor, "pai_id": pai_id},
+    )
+    return valor
+
+async def inserir_e_falhar(db, valor):
+    await inserir(db, valor)
+    raise ValueError(f"falha em {valor}")
+
+@pytest.fixture(autouse=True)
+def limpar_executadas():
+    executadas.clear()
+
+def test_operacao_com_erro_e_desfeita_sem_afetar_o_lote(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco(_criar_tabelas, chaves_estrangeiras=True)
+        coletor = ColetorEscritas(INTERVALO_MS, 64, fabrica)
+        coletor.iniciar()
+        resultados = await asyncio.gather(
+            coletor.executar(inserir, "a"),
+            coletor.executar(inserir_e_falhar, "b"),
+            coletor.executar(inserir, "a"),
+            coletor.executar(inserir, "c"),
+            return_exceptions=True,
+        )
+        await coletor.encerrar()
+        valores = await _valores(fabrica)
+        await engine.dispose()
+        return coletor, resultados, valores
+
+    coletor, resultados, valores = asyncio.run(cenario())
+    assert resultados[0] == "a"
+    assert isinstance(resultados[1], ValueError)
+    assert isinstance(resultados[2], IntegrityError)
+    assert resultados[3] == "c"
+    # Só o SAVEPOINT das operações com erro foi desfeito
+    assert valores == {"a", "c"}
+    assert coletor.lotes == 1
+    assert coletor.operacoes == 4
+    assert coletor.falhas_lote == 0
+
+def test_requisicao_cancelada_nao_e_executada(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco(_criar_tabelas, chaves_estrangeiras=True)
+        coletor = ColetorEscritas(INTERVALO_MS, 64, fabrica)
+        coletor.iniciar()
+        primeira = asyncio.create_task(coletor.executar(inserir, "a"))
+        cancelada = asyncio.create_task(coletor.executar(inserir, "b"))
+        ultima = asyncio.create_task(coletor.executar(inserir, "c"))
+        await asyncio.sleep(0)
+        cancelada.cancel()
+        resultados = await asyncio.gather(primeira, ultima)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelada
+        await coletor.encerrar()
+        valores = await _valores(fabrica)
+        await engine.dispose()
+        return coletor, resultados, valores
+
+    coletor, resultados, valores = asyncio.run(cenario())
+    assert resultados == ["a", "c"]
+    assert executadas == ["a", "c"]
+    assert valores == {"a", "c"}
+    assert coletor.lotes == 1
+    assert coletor.operacoes == 2
+
+def test_falha_no_commit_chega_a_todo_o_lote(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco(_criar_tabelas, chaves_estrangeiras=True)
+        coletor = ColetorEscritas(INTERVALO_MS, 64, fabrica)
+        coletor.iniciar()
+        resultados = await asyncio.gather(
+            coletor.executar(inserir, "a"),
+            # Pai inexistente: cada operação passa, mas o COMMIT do lote falha
+            coletor.executar(inserir, "b", 999),
+            coletor.executar(inserir_e_falhar, "c"),
+            return_exceptions=True,
+        )
+        # O coletor continua atendendo depois da falha
+        depois = await coletor.executar(inserir, "d")
+        await coletor.encerrar()
+        valores = await _valores(fabrica)
+        await engine.dispose()
+        return coletor, resultados, depois, valores
+
+    coletor, resultados, depois, valores = asyncio.run(cenario())
+    assert all(isinstance(resultado, IntegrityError) for resultado in resultados)
+    assert depois == "d"
+    assert valores == {"d"}
+    assert coletor.falhas_lote == 1
+    assert coletor.lotes == 1
+
+def test_lote_respeita_maximo_de_operacoes(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco(_criar_tabelas, chaves_estrangeiras=True)
+        coletor = ColetorEscritas(INTERVALO_MS, 4, fabrica)
+        coletor.iniciar()
+        resultados = await asyncio.gather(*(coletor.executar(inserir, str(i)) for i in range(10)))
+        await coletor.encerrar()
+        valores = await _valores(fabrica)
+        await engine.dispose()
+        return coletor, resultados, valores
+
+    coletor, resultados, valores = asyncio.run(cenario())
+    assert resultados == [str(i) for i in range(10)]
+    assert valores == {str(i) for i in range(10)}
+    assert coletor.lotes == 3
+
+def test_encerrar_grava_operacoes_enfileiradas(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco(_criar_tabelas, chaves_estrangeiras=True)
+        coletor = ColetorEscritas(INTERVALO_MS, 64, fabrica)
+        coletor.iniciar()
+        pendentes = [asyncio.create_task(coletor.executar(inserir, valor)) for valor in "abc"]
+        await asyncio.sleep(0)
+        await coletor.encerrar()
+        resultados = await asyncio.gather(*pendentes)
+        with pytest.raises(RuntimeError):
+            await coletor.executar(inserir, "d")
+        valores = await _valores(fabrica)
+        await engine.dispose()
+        return resultados, valores
+
+    resultados, valores = asyncio.run(cenario())
+    assert resultados == ["a", "b", "c"]
+    assert valores == {"a", "b", "c"}
@@ -0,0 +1,91 @@
+import asyncio
+
+from sqlalchemy import func, insert, select
+
+from app import estatisticas, models
+
+# Contadores incrementais comparados com a contagem direta das tabelas,
+# depois de passar por todas as rotas que escrevem personagens e itens.
+
+async def _preparar(preparar_banco):
+    engine, fabrica = await preparar_banco()
+    async with fabrica() as db:
+        await db.execute(insert(models.Usuario).values(id=1, username="aria", email="aria@exemplo.com", password_hash="x"))
+        await db.commit()
+    return engine, fabrica
+
+def _contadores(conexao):
+    linhas = lambda modelo, *colunas: {
+        tuple(linha[:-1]): linha[-1]
+        for linha in conexao.execute(select(*colunas, modelo.quantidade).where(modelo.quantidade != 0))
+    }
+    return {
+        "itens_personagem": linhas(models.ContagemItensPersonagem, models.ContagemItensPersonagem.personagem_id, models.ContagemItensPersonagem.tipo),
+        "itens_usuario": linhas(models.ContagemItensUsuario, models.ContagemItensUsuario.usuario_id, models.ContagemItensUsuario.tipo),
+        "classes_usuario": linhas(models.ContagemClassesUsuario, models.ContagemClassesUsuario.usuario_id, models.ContagemClassesUsuario.classe),
+    }
+
+def _recontagem(conexao):
+    contar = lambda consulta: {tuple(linha[:-1]): linha[-1] for linha in conexao.execute(consulta)}
+    return {
+        "itens_personagem": contar(
+            select(models.Item.personagem_id, models.Item.tipo, func.count()).group_by(models.Item.personagem_id, models.Item.tipo)
+        ),
+        "itens_usuario": contar(
+            select(models.Personagem.usuario_id, models.Item.tipo, func.count())
+            .join(models.Personagem).group_by(models.Personagem.usuario_id, models.Item.tipo)
+        ),
+        "classes_usuario": contar(
+            select(models.Personagem.usuario_id, models.Personagem.classe, func.count())
+            .group_by(models.Personagem.usuario_id, models.Personagem.classe)
+        ),
+    }
+
+def test_contadores_acompanham_as_escritas_e_a_reconstrucao(preparar_banco, criar_cliente):
+    engine, fabrica = asyncio.run(_preparar(preparar_banco))
+    cliente = criar_cliente(fabrica)
+
+    aria = cliente.post("/personagens", json={"nome": "Aria", "classe": "Maga", "nivel": 3}).json()["id"]
+    gerados = cliente.post("/personagens/gerar", json={"quantidade": 5, "semente": 7, "itens_maximo": 4}).json()
+    assert gerados["personagens"] == 5
+    importacao = b'{"nome": "Bram", "classe": "Guerreiro", "nivel": 2, "itens": [{"nome": "Machado", "descricao": "", "tipo": "arma"}]}\n'
+    assert cliente.post("/meu-perfil/import", content=importacao).json()["personagens"] == 1
+
+    item = cliente.post(f"/personagens/{aria}/inventario", json={"nome": "Cajado", "descricao": "", "tipo": "arma"}).json()
+    lote = cliente.post(f"/personagens/{aria}/inventario/lote", json=[
+        {"nome": f"Poção {i}", "descricao": "", "tipo": "poção"} for i in range(4)
+    ]).json()
+    # Troca de tipo, unitária e em lote
+    cliente.put(f"/personagens/{aria}/inventario/{item['id']}", json={"nome": "Cajado", "descricao": "", "tipo": "relíquia"})
+    cliente.put(f"/personagens/{aria}/inventario/lote", json=[
+        {"id": lote[0]["id"], "nome": "Anel", "descricao": "", "tipo": "anel"},
+    ])
+    cliente.delete(f"/personagens/{aria}/inventario/{lote[1]['id']}")
+    cliente.request("DELETE", f"/personagens/{aria}/inventario/lote", json=[lote[2]["id"], 999])
+    alvo = gerados["ids"][0]
+    for item_gerado in cliente.get(f"/personagens/{alvo}/inventario").json():
+        cliente.delete(f"/personagens/{alvo}/inventario/{item_gerado['id']}")
+
+    async def verificar():
+        async with engine.connect() as conexao:
+            incrementais = await conexao.run_sync(_contadores)
+            recontagem = await conexao.run_sync(_recontagem)
+        async with engine.begin() as conexao:
+            await conexao.run_sync(estatisticas.reconstruir)
+        async with engine.connect() as conexao:
+            reconstruidos = await conexao.run_sync(_contadores)
+        await engine.dispose()
+        return incrementais, recontagem, reconstruidos
+
+    resumo = cliente.get("/estatisticas").json()
+    resumo_aria = cliente.get(f"/personagens/{aria}/estatisticas").json()
+    resumo_alvo = cliente.get(f"/personagens/{alvo}/estatisticas").json()
+    incrementais, recontagem, reconstruidos = asyncio.run(verificar())
+
+    assert incrementais == recontagem
+    assert reconstruidos == recontagem
+    assert resumo["personagens"] == 7
+    assert resumo["itens_por_tipo"] == {tipo: n for (_, tipo), n in recontagem["itens_usuario"].items()}
+    assert resumo["personagens_por_classe"] == {classe: n for (_, classe), n in recontagem["classes_usuario"].items()}
+    assert resumo_aria["itens_por_tipo"] == {"anel": 1, "poção": 1, "relíquia": 1}
+    assert resumo_alvo == {"personagem_id": alvo, "itens": 0, "itens_por_tipo": {}}
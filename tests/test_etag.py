@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app import models
+from app.cache import cache_respostas
+
+# GET condicional (If-None-Match) nas leituras de personagem e inventário.
+
+async def _preparar(preparar_banco):
+    engine, fabrica = await preparar_banco()
+    async with fabrica() as db:
+        await db.execute(insert(models.Usuario).values(id=1, username="aria", email="aria@exemplo.com", password_hash="x"))
+        await db.execute(insert(models.Personagem).values(id=1, nome="Aria", classe="Maga", usuario_id=1))
+        await db.commit()
+    return engine, fabrica
+
+@pytest.fixture(params=[True, False], ids=["com_cache", "sem_cache"])
+def cliente(request, preparar_banco, criar_cliente, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(cache_respostas, "capacidade_bytes", 0)
+    engine, fabrica = asyncio.run(_preparar(preparar_banco))
+    yield criar_cliente(fabrica)
+    asyncio.run(engine.dispose())
+
+@pytest.mark.parametrize("rota", ["/personagens/1", "/personagens/1/inventario"])
+def test_if_none_match_responde_304(cliente, rota):
+    primeira = cliente.get(rota)
+    etag = primeira.headers["etag"]
+    assert primeira.status_code == 200
+
+    for cabecalho in (etag, f"W/{etag}", f'"outro", {etag}', "*"):
+        condicional = cliente.get(rota, headers={"If-None-Match": cabecalho})
+        assert condicional.status_code == 304, cabecalho
+        assert condicional.headers["etag"] == etag
+        assert condicional.content == b""
+    assert cliente.get(rota, headers={"If-None-Match": '"outro"'}).status_code == 200
+    # Parâmetros diferentes são outra representação, com outro ETag
+    assert cliente.get(rota, params={"incluir": "x"}).headers["etag"] != etag
+
+def test_escrita_no_inventario_muda_o_etag(cliente):
+    antes = cliente.get("/personagens/1")
+    etag = antes.headers["etag"]
+    etag_inventario = cliente.get("/personagens/1/inventario").headers["etag"]
+
+    item = cliente.post("/personagens/1/inventario", json={"nome": "Cajado", "descricao": "", "tipo": "arma"}).json()
+    depois = cliente.get("/personagens/1", headers={"If-None-Match": etag})
+    assert depois.status_code == 200
+    assert depois.headers["etag"] != etag
+    assert [i["nome"] for i in depois.json()["itens"]] == ["Cajado"]
+    assert cliente.get("/personagens/1/inventario", headers={"If-None-Match": etag_inventario}).status_code == 200
+
+    # Cada escrita avança a versão: atualização e remoção também
+    for escrever in (
+        lambda: cliente.put(f"/personagens/1/inventario/{item['id']}", json={"nome": "Cajado", "descricao": "", "tipo": "relíquia"}),
+        lambda: cliente.delete(f"/personagens/1/inventario/{item['id']}"),
+    ):
+        etag = cliente.get("/personagens/1").headers["etag"]
+        assert escrever().status_code == 200
+        assert cliente.get("/personagens/1", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,46 @@
+import asyncio
+import json
+
+from sqlalchemy import func, insert, select
+
+from app import exportacao, inventario, models
+
+# Importação NDJSON sobre um SQLite temporário.
+
+async def _corpo(linhas):
+    for linha in linhas:
+        yield linha
+
+def test_importacao_grava_lotes_limitados_em_bytes(preparar_banco, monkeypatch):
+    monkeypatch.setattr(exportacao, "TAMANHO_MAXIMO_LOTE_BYTES", 64 * 1024)
+    descricao = "x" * (20 * 1024)
+    linhas = [
+        json.dumps({"nome": f"Aria {i}", "classe": "Maga", "nivel": 1, "itens": [
+            {"nome": "Grimório", "descricao": descricao, "tipo": "pergaminho"}
+        ]}).encode() + b"\n"
+        for i in range(10)
+    ]
+    lotes = []
+    inserir_personagens = inventario.inserir_personagens
+
+    async def _inserir_e_contar(db, usuario_id, personagens, itens_por_personagem):
+        lotes.append(len(personagens))
+        return await inserir_personagens(db, usuario_id, personagens, itens_por_personagem)
+
+    monkeypatch.setattr(inventario, "inserir_personagens", _inserir_e_contar)
+
+    async def cenario():
+        engine, fabrica = await preparar_banco()
+        async with fabrica() as db:
+            await db.execute(insert(models.Usuario).values(id=1, username="aria", email="aria@exemplo.com", password_hash="x"))
+            totais = await exportacao.importar_ndjson(db, 1, _corpo(linhas))
+            await db.commit()
+            personagens = await db.scalar(select(func.count()).select_from(models.Personagem))
+        await engine.dispose()
+        return totais, personagens
+
+    totais, personagens = asyncio.run(cenario())
+    # Cada linha tem ~20 KiB: o lote fecha ao passar de 64 KiB, bem antes de TAMANHO_LOTE linhas
+    assert lotes == [4, 4, 2]
+    assert totais == {"personagens": 10, "itens": 10, "ignorados": 0}
+    assert personagens == 10
@@ -0,0 +1,94 @@
+import asyncio
+import random
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from app import gerador, models
+
+# Escritas no inventário pela API sobre um SQLite temporário.
+
+NOMES_ITENS = ["zeta", "alfa", "Beta", "gama"]
+
+async def _preparar(preparar_banco):
+    engine, fabrica = await preparar_banco()
+    async with fabrica() as db:
+        await db.execute(insert(models.Usuario).values(
+            id=1, username="aria", email="aria@exemplo.com", password_hash="x"
+        ))
+        await db.execute(insert(models.Personagem).values(id=1, nome="Aria", classe="Maga", usuario_id=1))
+        await db.commit()
+    return engine, fabrica
+
+@pytest.fixture
+def banco(preparar_banco):
+    engine, fabrica = asyncio.run(_preparar(preparar_banco))
+    yield engine, fabrica
+    asyncio.run(engine.dispose())
+
+def test_lote_insere_numa_instrucao_e_responde_na_ordem_do_pedido(banco, criar_cliente):
+    engine, fabrica = banco
+    cliente = criar_cliente(fabrica)
+    # Um item avulso antes, para os ids do lote não começarem em 1
+    assert cliente.post("/personagens/1/inventario", json={"nome": "Adaga", "descricao": "", "tipo": "arma"}).status_code == 200
+
+    insercoes = []
+
+    def _contar(conn, cursor, instrucao, parametros, contexto, executemany):
+        if instrucao.startswith("INSERT INTO itens"):
+            insercoes.append(executemany)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _contar)
+    try:
+        resposta = cliente.post("/personagens/1/inventario/lote", json=[
+            {"nome": nome, "descricao": f"item {i}", "tipo": "arma"} for i, nome in enumerate(NOMES_ITENS)
+        ])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _contar)
+
+    assert resposta.status_code == 200
+    assert insercoes == [True]
+    resultados = resposta.json()
+    assert [r["item"]["nome"] for r in resultados] == NOMES_ITENS
+    assert [r["item"]["descricao"] for r in resultados] == [f"item {i}" for i in range(len(NOMES_ITENS))]
+    assert all(r["sucesso"] and r["id"] == r["item"]["id"] for r in resultados)
+    # Cada id devolvido é o do item com esse nome no banco
+    inventario = cliente.get("/personagens/1/inventario").json()
+    por_id = {item["id"]: item["nome"] for item in inventario}
+    assert all(por_id[r["id"]] == r["item"]["nome"] for r in resultados)
+    assert len(inventario) == len(NOMES_ITENS) + 1
+
+def test_elenco_gerado_insere_personagens_numa_instrucao(banco):
+    engine, fabrica = banco
+    personagens, itens_por_personagem = gerador.gerar_elenco(random.Random(7), 50, itens_minimo=1, itens_maximo=4)
+    insercoes = []
+
+    def _contar(conn, cursor, instrucao, parametros, contexto, executemany):
+        if instrucao.startswith("INSERT INTO personagens"):
+            insercoes.append(executemany)
+
+    async def cenario():
+        async with fabrica() as db:
+            event.listen(engine.sync_engine, "before_cursor_execute", _contar)
+            try:
+                totais = await gerador.inserir_elenco(db, 1, personagens, itens_por_personagem)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", _contar)
+            await db.commit()
+            linhas = (await db.execute(
+                select(models.Personagem.id, models.Personagem.nome, models.Item.nome)
+                .join(models.Item)
+                .where(models.Personagem.id.in_(totais["ids"]))
+                .order_by(models.Item.id)
+            )).all()
+        return totais, linhas
+
+    totais, linhas = asyncio.run(cenario())
+    assert insercoes == [True]
+    assert totais["personagens"] == len(personagens)
+    # Os itens de cada personagem ficaram com o personagem certo
+    gravados = {}
+    for personagem_id, nome, item in linhas:
+        gravados.setdefault(nome, []).append(item)
+    assert gravados == {p["nome"]: [item["nome"] for item in itens] for p, itens in zip(personagens, itens_por_personagem)}
+    assert sorted({personagem_id for personagem_id, _, _ in linhas}) == totais["ids"]
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app import limitador, models
+from app.cache import UsuarioAutenticado
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(limitador, "time", relogio)
+    return relogio
+
+def test_balde_esgota_na_rajada_e_repoe_com_o_tempo(relogio):
+    balde = limitador.Limitador("teste", capacidade=3, por_minuto=60, maximo_chaves=10)
+    assert [balde.consumir("u:1") for _ in range(3)] == [0, 0, 0]
+    assert balde.consumir("u:1") == pytest.approx(1.0)
+    # Outra chave tem o próprio balde
+    assert balde.consumir("u:2") == 0
+
+    relogio.agora += 0.5
+    assert balde.consumir("u:1") == pytest.approx(0.5)
+    relogio.agora += 0.5
+    assert balde.consumir("u:1") == 0
+    # A reposição nunca passa da capacidade
+    relogio.agora += 3600
+    assert [balde.consumir("u:1") for _ in range(4)][-1] > 0
+    assert balde.estatisticas() == {"chaves": 2, "permitidas": 8, "bloqueadas": 3}
+
+def test_baldes_alem_do_maximo_sao_esquecidos(relogio):
+    balde = limitador.Limitador("teste", capacidade=1, por_minuto=1, maximo_chaves=2)
+    for chave in ("a", "b", "c"):
+        assert balde.consumir(chave) == 0
+    # "a" foi descartado pelo LRU e recomeça cheio
+    assert balde.consumir("a") == 0
+    assert balde.consumir("c") > 0
+
+async def _preparar(preparar_banco):
+    engine, fabrica = await preparar_banco()
+    async with fabrica() as db:
+        await db.execute(insert(models.Usuario), [
+            {"id": 1, "username": "aria", "email": "aria@exemplo.com", "password_hash": "x"},
+            {"id": 2, "username": "bram", "email": "bram@exemplo.com", "password_hash": "x"},
+        ])
+        await db.commit()
+    return engine, fabrica
+
+@pytest.fixture
+def banco(preparar_banco):
+    engine, fabrica = asyncio.run(_preparar(preparar_banco))
+    yield fabrica
+    asyncio.run(engine.dispose())
+
+def _limitar(monkeypatch, categoria, capacidade, por_minuto):
+    monkeypatch.setattr(limitador.limitadores[categoria], "capacidade", capacidade)
+    monkeypatch.setattr(limitador.limitadores[categoria], "taxa", por_minuto / 60)
+
+def test_rota_autenticada_responde_429_por_usuario(banco, criar_cliente, monkeypatch):
+    _limitar(monkeypatch, "leitura", 2, 6)
+    cliente = criar_cliente(banco)
+    assert [cliente.get("/personagens").status_code for _ in range(2)] == [200, 200]
+    bloqueada = cliente.get("/personagens")
+    assert bloqueada.status_code == 429
+    # Falta um token a 6 por minuto: 10 segundos
+    assert bloqueada.headers["Retry-After"] == "10"
+    # O orçamento é por usuário e por categoria
+    assert cliente.post("/personagens", json={"nome": "Aria", "classe": "Maga", "nivel": 1}).status_code == 200
+    outro = criar_cliente(banco, UsuarioAutenticado(id=2, username="bram", email="bram@exemplo.com"))
+    assert outro.get("/personagens").status_code == 200
+
+def test_rota_publica_limita_por_ip(banco, criar_cliente, monkeypatch):
+    _limitar(monkeypatch, "caro", 1, 1)
+    cliente = criar_cliente(banco)
+    credenciais = {"username": "ninguem", "password": "errada"}
+    assert cliente.post("/login", data=credenciais).status_code == 401
+    bloqueada = cliente.post("/login", data=credenciais)
+    assert bloqueada.status_code == 429
+    assert bloqueada.headers["Retry-After"] == "60"
+    # O balde é o do IP do cliente, não o de um usuário
+    [chave] = limitador.limitadores["caro"]._baldes
+    assert chave.startswith("ip:")
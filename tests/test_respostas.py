@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app import models, serializacao
+from app.cache import cache_respostas
+
+# Leituras de personagens pela API sobre um SQLite temporário. Os nomes dos
+# itens fora da ordem dos ids expõem qualquer caminho que os ordene de outro
+# jeito (ex.: pelo índice em (personagem_id, nome)).
+
+NOMES_ITENS = ["zeta", "alfa", "Beta"]
+
+async def _preparar(preparar_banco):
+    engine, fabrica = await preparar_banco()
+    async with fabrica() as db:
+        await db.execute(insert(models.Usuario).values(
+            id=1, username="aria", email="aria@exemplo.com", password_hash="x"
+        ))
+        await db.execute(insert(models.Personagem).values(id=1, nome="Aria", classe="Maga", usuario_id=1))
+        await db.execute(insert(models.Item), [
+            {"nome": nome, "descricao": "", "tipo": "arma", "personagem_id": 1} for nome in NOMES_ITENS
+        ])
+        await db.commit()
+    return engine, fabrica
+
+@pytest.fixture
+def banco(preparar_banco):
+    engine, fabrica = asyncio.run(_preparar(preparar_banco))
+    yield fabrica
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def cliente(banco, criar_cliente):
+    return criar_cliente(banco)
+
+def test_cache_de_respostas_nao_muda_o_corpo(cliente, monkeypatch):
+    com_cache = cliente.get("/personagens/1")
+    monkeypatch.setattr(cache_respostas, "capacidade_bytes", 0)
+    sem_cache = cliente.get("/personagens/1")
+
+    assert com_cache.status_code == sem_cache.status_code == 200
+    assert com_cache.content == sem_cache.content
+    assert com_cache.headers["etag"] == sem_cache.headers["etag"]
+    assert [item["nome"] for item in com_cache.json()["itens"]] == NOMES_ITENS
+    # Listagem e perfil trazem os itens na mesma ordem
+    assert cliente.get("/personagens").json()[0] == com_cache.json()
+    assert cliente.get("/meu-perfil").json()["personagens"][0] == com_cache.json()
+
+def test_verificacao_compara_com_o_response_model(cliente, monkeypatch):
+    monkeypatch.setattr(serializacao.configuracoes, "serializacao_rapida", True)
+    monkeypatch.setattr(serializacao.configuracoes, "serializacao_verificar", True)
+    for rota in ("/personagens/1", "/personagens", "/personagens?incluir_itens=false",
+                 "/meu-perfil", "/personagens/1/inventario?ordenar_por=nome"):
+        assert cliente.get(rota).status_code == 200, rota
+    # O primeiro GET passou por codificar() (cache ligado); sem cache, por resposta()
+    monkeypatch.setattr(cache_respostas, "capacidade_bytes", 0)
+    assert cliente.get("/personagens/1").status_code == 200
+
+def test_verificacao_detecta_itens_fora_de_ordem(banco):
+    async def cenario():
+        async with banco() as db:
+            dados = await serializacao.personagem(db, 1, 1)
+            await serializacao.verificar_formato(db, serializacao.ADAPTADOR_PERSONAGEM, dados)
+            dados["itens"].sort(key=lambda item: item["nome"])
+            with pytest.raises(ValueError):
+                await serializacao.verificar_formato(db, serializacao.ADAPTADOR_PERSONAGEM, dados)
+
+    asyncio.run(cenario())
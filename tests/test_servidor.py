@@ -0,0 +1,52 @@
+import signal
+from types import SimpleNamespace
+
+import pytest
+
+from app import security, servidor
+from app.config import configuracoes
+
+@pytest.fixture
+def sinais_originais():
+    originais = {sinal: signal.getsignal(sinal) for sinal in (signal.SIGTERM, signal.SIGINT)}
+    yield
+    for sinal, handler in originais.items():
+        signal.signal(sinal, handler)
+
+def test_supervisor_desiste_de_workers_que_falham_ao_iniciar(monkeypatch, sinais_originais):
+    criados = []
+    monkeypatch.setattr(servidor, "INTERVALO_SUPERVISAO_S", 0.01)
+    monkeypatch.setattr(servidor, "_executar_worker", lambda app, sock, args: servidor.CODIGO_FALHA_INICIALIZACAO)
+    criar_worker = servidor._criar_worker
+
+    def _criar_e_contar(app, sock, args):
+        criados.append(criar_worker(app, sock, args))
+        return criados[-1]
+
+    monkeypatch.setattr(servidor, "_criar_worker", _criar_e_contar)
+    codigo = servidor.supervisionar(None, None, SimpleNamespace(workers=2, tempo_encerramento=1))
+
+    assert codigo == 1
+    # Os dois primeiros e os substitutos até a última falha permitida
+    assert len(criados) == servidor.MAXIMO_FALHAS_SEGUIDAS
+
+def test_espera_reinicio_cresce_ate_o_maximo():
+    esperas = [servidor.espera_reinicio(falhas) for falhas in range(12)]
+    assert esperas[0] == 0
+    assert esperas == sorted(esperas)
+    assert esperas[-1] == servidor.ESPERA_REINICIO_MAXIMA_S
+
+def test_pool_de_hash_dividido_entre_workers(monkeypatch):
+    monkeypatch.setattr(configuracoes, "processos_hash", 8)
+    monkeypatch.setattr(configuracoes, "limite_fila_hash", None)
+    monkeypatch.setattr(security, "PROCESSOS_HASH", security.PROCESSOS_HASH)
+    monkeypatch.setattr(security, "LIMITE_FILA_HASH", security.LIMITE_FILA_HASH)
+
+    security.dividir_executor_hash(4)
+    assert (security.PROCESSOS_HASH, security.LIMITE_FILA_HASH) == (2, 16)
+    # Mais workers que núcleos: ao menos um processo por worker
+    security.dividir_executor_hash(16)
+    assert (security.PROCESSOS_HASH, security.LIMITE_FILA_HASH) == (1, 8)
+    monkeypatch.setattr(configuracoes, "limite_fila_hash", 100)
+    security.dividir_executor_hash(4)
+    assert security.LIMITE_FILA_HASH == 25
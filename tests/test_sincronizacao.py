@@ -0,0 +1,106 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import delete, insert, select
+
+from app import inventario, models, sincronizacao
+
+# Registro de alterações e compactação sobre um SQLite temporário.
+
+async def _criar_item(db, usuario_id, personagem_id, nome):
+    item_id = (await db.execute(
+        insert(models.Item).values(nome=nome, descricao="", tipo="arma", personagem_id=personagem_id)
+    )).inserted_primary_key[0]
+    await sincronizacao.registrar(db, usuario_id, sincronizacao.ITEM, sincronizacao.CRIAR, [(item_id, personagem_id)])
+    return item_id
+
+def test_compactacao_nao_confunde_id_reaproveitado_por_outro_usuario(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco()
+        async with fabrica() as db:
+            await db.execute(insert(models.Usuario), [
+                {"id": 1, "username": "a", "email": "a@exemplo.com", "password_hash": "x"},
+                {"id": 2, "username": "b", "email": "b@exemplo.com", "password_hash": "x"},
+            ])
+            await db.execute(insert(models.Personagem), [
+                {"id": 1, "nome": "Aria", "classe": "Maga", "usuario_id": 1},
+                {"id": 2, "nome": "Bram", "classe": "Guerreiro", "usuario_id": 2},
+            ])
+            item_a = await _criar_item(db, 1, 1, "Cajado")
+            await db.commit()
+            cursor = await sincronizacao.cursor_atual(db)
+
+            await db.execute(delete(models.Item).where(models.Item.id == item_a))
+            await sincronizacao.registrar(db, 1, sincronizacao.ITEM, sincronizacao.REMOVER, [(item_a, 1)])
+            # Sem AUTOINCREMENT o SQLite devolve o mesmo id ao próximo item
+            item_b = await _criar_item(db, 2, 2, "Machado")
+            await db.commit()
+
+        async with engine.begin() as conexao:
+            resultado = await conexao.run_sync(sincronizacao.compactar, timedelta(days=30))
+
+        async with fabrica() as db:
+            delta_a = await sincronizacao.alteracoes_desde(db, 1, cursor, 100)
+            delta_b = await sincronizacao.alteracoes_desde(db, 2, 0, 100)
+        await engine.dispose()
+        return item_a, item_b, resultado, delta_a, delta_b
+
+    item_a, item_b, resultado, delta_a, delta_b = asyncio.run(cenario())
+    assert item_a == item_b
+    # Só a criação do item de A foi superada (pela remoção do mesmo item)
+    assert resultado["superadas"] == 1
+    assert resultado["compactado_ate"] is None
+    assert delta_a["itens_removidos"] == [item_a]
+    assert delta_a["itens"] == []
+    assert [item["nome"] for item in delta_b["itens"]] == ["Machado"]
+
+def test_insercao_em_lote_registra_todos_os_itens(preparar_banco):
+    async def cenario():
+        engine, fabrica = await preparar_banco()
+        async with fabrica() as db:
+            await db.execute(insert(models.Usuario).values(id=1, username="a", email="a@exemplo.com", password_hash="x"))
+            totais = await inventario.inserir_personagens(
+                db, 1,
+                [{"nome": f"Aria {i}", "classe": "Maga", "nivel": 1} for i in range(3)],
+                [[{"nome": f"Item {i}.{j}", "descricao": "", "tipo": "arma"} for j in range(i + 1)] for i in range(3)],
+            )
+            await db.commit()
+            delta = await sincronizacao.alteracoes_desde(db, 1, 0, 100)
+            item_ids = (await db.scalars(select(models.Item.id).order_by(models.Item.id))).all()
+        await engine.dispose()
+        return totais, delta, item_ids
+
+    totais, delta, item_ids = asyncio.run(cenario())
+    assert totais["itens"] == len(item_ids) == 6
+    assert [p["id"] for p in delta["personagens"]] == totais["ids"]
+    assert [(i["id"], i["nome"]) for i in delta["itens"]] == [
+        (item_id, f"Item {i}.{j}") for item_id, (i, j) in zip(item_ids, [(i, j) for i in range(3) for j in range(i + 1)])
+    ]
+
+def test_cursor_alem_da_ultima_alteracao_exige_carga_completa(preparar_banco, criar_cliente):
+    async def preparar():
+        engine, fabrica = await preparar_banco()
+        async with fabrica() as db:
+            await db.execute(insert(models.Usuario).values(id=1, username="aria", email="aria@exemplo.com", password_hash="x"))
+            await inventario.inserir_personagens(
+                db, 1, [{"nome": "Aria", "classe": "Maga", "nivel": 1}],
+                [[{"nome": "Cajado", "descricao": "", "tipo": "arma"}]],
+            )
+            await db.commit()
+            cursor = await sincronizacao.cursor_atual(db)
+        return engine, fabrica, cursor
+
+    engine, fabrica, cursor = asyncio.run(preparar())
+    cliente = criar_cliente(fabrica)
+    try:
+        futuro = cliente.get("/sync", params={"desde": 999999})
+        assert futuro.status_code == 410
+        assert futuro.json()["resincronizar"] is True
+        assert futuro.json()["cursor"] == cursor
+
+        atual = cliente.get("/sync", params={"desde": cursor})
+        assert atual.status_code == 200
+        assert atual.json()["cursor"] == cursor
+        assert cliente.get("/sync", params={"desde": 0}).json()["cursor"] == cursor
+    finally:
+        asyncio.run(engine.dispose())